@@ -0,0 +1,350 @@
+# Description: Headless benchmarks of ConfigTUI on synthetic configuration files
+# Results are written as json, to compare the performance between commits
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+code_dir = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(code_dir, os.pardir, 'config_tui')
+APP_FILE = os.path.join(APP_DIR, 'config-tui.py')
+
+SHAPES = ['wide', 'deep', 'list', 'comments']
+# modules which must not be imported when the UI is not run, as they are slow to import
+HEAVY_MODULES = ('textual', 'rich', 'ruamel')
+
+
+def load_app_module():
+    """Import the editor module of ConfigTUI, which imports the core module from the same folder."""
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import editor
+    return editor
+
+
+def generate_data(shape: str, size: int) -> object:
+    """Generate a configuration with roughly `size` nodes of the given shape."""
+    if shape in ('wide', 'comments'):
+        # flat map of feature flags
+        return {f'flag_{i}': (i % 3 == 0) if i % 2 else f'value-{i}' for i in range(size)}
+    elif shape == 'deep':
+        # many chains of nested maps, 10 levels deep
+        data = {}
+        for i in range(max(size // 10, 1)):
+            node = {'leaf': i}
+            for level in range(8, 0, -1):
+                node = {f'level_{level}': node}
+            data[f'chain_{i}'] = node
+        return data
+    elif shape == 'list':
+        # a long list of small items
+        return {'items': [{'id': i, 'name': f'item-{i}'} for i in range(max(size // 3, 1))]}
+    raise ValueError(f'Unknown shape [{shape}]')
+
+
+def to_yaml(data: object, comments: bool = False) -> str:
+    """Emit block style yaml for the generated data. Much faster than a yaml dumper for large data."""
+    lines = []
+
+    def scalar(value) -> str:
+        return json.dumps(value) if isinstance(value, str) else str(value).lower()
+
+    def emit(value, indent: int, in_list: bool = False) -> None:
+        pad = '  ' * indent
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        first = True
+        for key, child in items:
+            if isinstance(value, dict):
+                prefix = f'{pad}{key}:' if not (in_list and first) else f'{"  " * (indent - 1)}- {key}:'
+            else:
+                prefix = f'{pad}-'
+            first = False
+            comment = f'  # comment on {key}' if comments else ''
+            if isinstance(child, dict):
+                lines.append(f'{prefix}{comment}')
+                emit(child, indent + 1)
+            elif isinstance(child, list):
+                lines.append(f'{prefix}{comment}')
+                for item in child:
+                    if isinstance(item, dict):
+                        emit(item, indent + 1, in_list=True)
+                    else:
+                        lines.append(f'{pad}- {scalar(item)}')
+            else:
+                lines.append(f'{prefix} {scalar(child)}{comment}')
+
+    emit(data, 0)
+    return '\n'.join(lines) + '\n'
+
+
+def write_config(directory: str, shape: str, fmt: str, size: int) -> str:
+    """Write a synthetic configuration file & return its path."""
+    data = generate_data(shape, size)
+    path = os.path.join(directory, f'{shape}_{size}.{fmt}')
+    with open(path, 'w') as out:
+        if fmt == 'json':
+            json.dump(data, out, indent=2)
+        else:
+            out.write(to_yaml(data, comments=(shape == 'comments')))
+    return path
+
+
+def first_leaf(node):
+    """Find the first leaf node, materializing lazy nodes on the way."""
+    while node.allow_expand:
+        node.tree.app._load_children_(node)
+        if not node.children:
+            return None
+        node = node.children[0]
+    return node
+
+
+def first_child(node):
+    """Find the first element of a nested node, through the range groups of large dicts/lists."""
+    node.tree.app._load_children_(node)
+    node = node.children[0]
+    while node.data.bounds is not None:
+        node.tree.app._load_children_(node)
+        node = node.children[0]
+    return node
+
+
+async def run_case(module, config_file: str, lazy_load: bool) -> dict:
+    """Drive the editor headlessly through all the steps & time each of them."""
+    timings = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        app = module.ConfigurationEditor(config_file=config_file, lazy_load=lazy_load, edit_dict_keys=True, expand_limit=0)
+        async with app.run_test() as pilot:
+            tree = app.json_tree
+            while app.loading:                  # loaded in background by workers
+                await pilot.pause()
+
+            start = time.perf_counter()
+            app.load_file()
+            timings['load_file'] = time.perf_counter() - start
+
+            tree.clear()
+            start = time.perf_counter()
+            app.update_tree(app.config_type.upper(), tree.root, app.json_data, app.default_highlight)
+            timings['update_tree'] = time.perf_counter() - start
+            timings['nodes'] = len(app.search_index.locations)
+
+            tree.root.collapse()
+            start = time.perf_counter()
+            app.action_toggle()
+            while app.fold_task is not None:     # expanded in batches by a worker
+                await pilot.pause()
+            tree.get_node_at_line(0)            # includes layout of the expanded lines
+            timings['expand_all'] = time.perf_counter() - start
+
+            leaf = first_leaf(tree.root)
+            if leaf is not None:
+                app.cur_node = leaf
+                app.edit_box.value = 'edited-value'
+                start = time.perf_counter()
+                app.edit_value()
+                timings['edit_value'] = time.perf_counter() - start
+
+            app.cur_node = tree.root
+            app.edit_box.value = "{'bench_new_key': {'nested': [1, 2, 3]}}"
+            start = time.perf_counter()
+            app.add_new_node()
+            timings['add_new_node'] = time.perf_counter() - start
+
+            # delete the first element of the first list if any, else the first key
+            target = first_child(tree.root)
+            if target.allow_expand and target.data.kind is module.NodeType.LIST:
+                target = first_child(target)
+            app.cur_node = target
+            app.action_delete_node()
+            await pilot.pause()
+            start = time.perf_counter()
+            app.screen.dismiss(True)
+            await pilot.pause()
+            timings['delete_node'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            app.action_reload()
+            await pilot.pause()
+            timings['reload'] = time.perf_counter() - start
+
+            app.action_save()
+            await pilot.pause()
+            app.screen.out_file_name.value = os.path.join(out_dir, os.path.basename(config_file))
+            start = time.perf_counter()
+            await app.screen.save_file().wait()    # written in background by a worker
+            timings['save_file'] = time.perf_counter() - start
+
+    return timings
+
+
+async def open_files(module, config_files: list) -> float:
+    """Time to open files together in the editor, till the trees of all of them are built."""
+    start = time.perf_counter()
+    app = module.ConfigurationEditor(config_files=config_files)
+    async with app.run_test() as pilot:
+        while any(session.loading for session in app.sessions):     # loaded concurrently by workers
+            await pilot.pause()
+        return time.perf_counter() - start
+
+
+def measure_startup(data_dir: str, repeat: int) -> list:
+    """Time the startup of the command line options which run without the UI, & find the heavy modules they import."""
+    json_file = write_config(data_dir, 'wide', 'json', 10)
+    cases = {
+        'version': ['-v'],
+        'missing_file': ['-i', os.path.join(data_dir, 'missing.yaml')],
+        'batch_get_json': ['-i', json_file, '--get', 'flag_0'],
+    }
+    results = []
+    for case, args in cases.items():
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, '-X', 'importtime', APP_FILE, *args], capture_output=True, text=True)
+            seconds = time.perf_counter() - start
+            # lines as 'import time: <self us> | <cumulative us> | <module>', nested modules are indented
+            import_us, modules = 0, set()
+            for line in proc.stderr.splitlines():
+                fields = line.split('|')
+                if not line.startswith('import time:') or not fields[1].strip().isdigit():
+                    continue
+                modules.add(fields[2].strip().split('.')[0])
+                if not fields[2][1:].startswith(' '):
+                    import_us += int(fields[1])
+            runs.append((seconds, import_us / 1e6, modules))
+        results.append({
+            'case': case,
+            'seconds': round(min(run[0] for run in runs), 6),
+            'import_seconds': round(min(run[1] for run in runs), 6),
+            'heavy_modules': sorted(set.union(*(run[2] for run in runs)).intersection(HEAVY_MODULES)),
+        })
+    return results
+
+
+def check_startup(results: list, budget_ms: float) -> int:
+    """Print startup timings. Returns number of cases over the import time budget, or importing heavy modules."""
+    failures = 0
+    print(f"\n{'startup case':20s} {'total':>9s} {'imports':>9s}  heavy modules")
+    for r in results:
+        flag = ''
+        if r['heavy_modules'] or r['import_seconds'] * 1000 > budget_ms:
+            failures += 1
+            flag = '  <-- over budget' if not r['heavy_modules'] else '  <-- imports heavy modules'
+        print(f"{r['case']:20s} {r['seconds']:9.4f} {r['import_seconds']:9.4f}  {', '.join(r['heavy_modules']) or '-'}{flag}")
+    return failures
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=code_dir, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results: list, baseline_file: str, threshold: float, min_seconds: float) -> int:
+    """Print timings relative to a baseline. Returns number of steps slower than the threshold."""
+    with open(baseline_file) as base:
+        baseline = {
+            (r['shape'], r['format'], r['size'], r['lazy'], r['step']): r['seconds'] for r in json.load(base)['results']
+        }
+    regressions = 0
+    print(f"\n{'case':40s} {'step':14s} {'base':>9s} {'now':>9s} {'ratio':>7s}")
+    for r in results:
+        old = baseline.get((r['shape'], r['format'], r['size'], r['lazy'], r['step']))
+        if not old or max(old, r['seconds']) < min_seconds:
+            continue
+        ratio = r['seconds'] / old
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  <-- slower'
+        case = f"{r['shape']}/{r['format']}/{r['size']}{'/lazy' if r['lazy'] else ''}"
+        print(f"{case:40s} {r['step']:14s} {old:9.4f} {r['seconds']:9.4f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Headless benchmarks of ConfigTUI on synthetic configuration files')
+    parser.add_argument('-s', '--sizes', nargs='+', type=int, default=[1000, 10000, 50000], help='approximate number of nodes in generated files')
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES, default=SHAPES, help='shapes of generated files')
+    parser.add_argument('--formats', nargs='+', choices=['yaml', 'json'], default=['yaml', 'json'], help='formats of generated files')
+    parser.add_argument('-l', '--lazy-load', action='store_true', default=False, help='run the editor with lazy loading of nested nodes')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='number of runs of each case, fastest timing of a step is reported [default: 1]')
+    parser.add_argument('-o', '--output', type=str, default='benchmark_results.json', help='json file to write the results to [default: benchmark_results.json]')
+    parser.add_argument('-c', '--compare', type=str, help='json results of an earlier run to compare against')
+    parser.add_argument('-t', '--threshold', type=float, default=1.25, help='ratio to baseline above which a step is reported as slower [default: 1.25]')
+    parser.add_argument('-m', '--min-seconds', type=float, default=0.005, help='ignore steps faster than this in comparisons, as they are mostly noise [default: 0.005]')
+    parser.add_argument('-b', '--startup-budget', type=float, default=100, help='max import time in ms of the options which run without the UI (-v, missing file, batch edit of json) [default: 100]')
+    parser.add_argument('--startup-only', action='store_true', default=False, help='only check the startup, without the editor benchmarks')
+    args = parser.parse_args()
+
+    results = []
+    files_by_size = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        startup = measure_startup(data_dir, max(args.repeat, 3))
+        # imported after the startup is measured, so that the imports are not cached
+        module = None if args.startup_only else load_app_module()
+        for shape in (args.shapes if module else []):
+            for fmt in args.formats:
+                if shape == 'comments' and fmt == 'json':
+                    continue        # json has no comments
+                for size in args.sizes:
+                    config_file = write_config(data_dir, shape, fmt, size)
+                    files_by_size.setdefault(size, []).append(config_file)
+                    runs = [asyncio.run(run_case(module, config_file, args.lazy_load)) for _ in range(args.repeat)]
+                    timings = {step: min(run[step] for run in runs) for step in runs[0]}
+                    nodes = timings.pop('nodes')
+                    for step, seconds in timings.items():
+                        results.append({
+                            'shape': shape, 'format': fmt, 'size': size, 'nodes': nodes,
+                            'lazy': args.lazy_load, 'step': step, 'seconds': round(seconds, 6),
+                            'file_bytes': os.path.getsize(config_file),
+                        })
+                    print(f"{shape}/{fmt}/{size}: " + ', '.join(f'{k}={v:.3f}s' for k, v in timings.items()), file=sys.stderr)
+
+        # files of a size opened together in tabs, against the largest & the sum of the files opened alone
+        for size, config_files in files_by_size.items():
+            if len(config_files) < 2:
+                continue
+            alone = [min(asyncio.run(open_files(module, [config_file])) for _ in range(args.repeat)) for config_file in config_files]
+            timings = {
+                'open_together': min(asyncio.run(open_files(module, config_files)) for _ in range(args.repeat)),
+                'open_largest': max(alone),
+                'open_sum': sum(alone),
+            }
+            for step, seconds in timings.items():
+                results.append({
+                    'shape': 'all', 'format': 'mixed', 'size': size, 'nodes': None,
+                    'lazy': args.lazy_load, 'step': step, 'seconds': round(seconds, 6),
+                    'file_bytes': sum(os.path.getsize(config_file) for config_file in config_files),
+                })
+            print(f"all/{size}: " + ', '.join(f'{k}={v:.3f}s' for k, v in timings.items()), file=sys.stderr)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'startup': startup,
+        'results': results,
+    }
+    with open(args.output, 'w') as out:
+        json.dump(report, out, indent=2)
+    print(f'Results written to [{args.output}]', file=sys.stderr)
+
+    failed = check_startup(startup, args.startup_budget)
+    if args.compare:
+        failed += compare(results, args.compare, args.threshold, args.min_seconds)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
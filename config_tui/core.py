@@ -0,0 +1,995 @@
+# Description: Parsing, indexing, editing & saving of configuration files, shared by the editor & the batch edits
+# UI modules are not imported here, so that the options which run without the UI start quickly
+__author__ = 'PrudhviCh'
+__version__ = '1.2.5'
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from functools import lru_cache, partial, wraps
+from itertools import accumulate
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ruamel.yaml import YAML
+
+# yaml syntax which is lost when loaded without the round-trip loader (comments, anchors, tags, quotes, flow & block styles),
+# & numbers or timestamps which would be saved in another format (0x1F, 007, 1_000, 1e3, .5, 1., 1.50, 0.00001, ...T10:20Z)
+ROUND_TRIP_SYNTAX = re.compile(
+    r'[#&*!\'"{}\[\]|>]|<<'
+    r'|(?:\A|\s)(?=[-+.\d])(?:\+[\d.]|-_|-?(?:\.[\d_]|0[xob\d_]|0\.0000|\d{4}-\d\d?-\d\d?(?:[Tt]|[ \t]+\d)|[\d.]{17}'
+    r'|\d+(?:[\d.]*(?:_|[eE][-+]?\d)|\.(?!\d)|\.\d*0(?!\d)(?<!\.0))))')
+# utf-8 encoded non-ascii characters, which are escaped in json files like json.dump does
+NON_ASCII = re.compile(rb'[\x80-\xff]+')
+# json text of orjson which may hold floats written unlike json.dump does: NaN & Infinity as null, 1e+22 as 1e22, 1e-05 as 0.00001
+ORJSON_FLOATS = re.compile(rb'null|\d[eE]|0\.0000')
+# json documents with nested data start with an object or an array
+JSON_START = re.compile(r'\s*[{\[]')
+# marker for keys which do not exist before an insert or after a delete
+ABSENT = object()
+# size of chunks in which files are read, to show the progress of loading
+READ_CHUNK_SIZE = 1 << 20
+# write buffer of saved files, dumpers emit many small writes
+WRITE_BUFFER_SIZE = 1 << 20
+# dicts/lists with more elements than this are shown in range groups of this size
+CHUNK_SIZE = 1000
+# nodes expanded by expand all before asking to expand the rest
+EXPAND_LIMIT = 100000
+# json containers of memory-mapped files larger than this are decoded only when they are needed
+SPAN_MIN_SIZE = 1 << 16
+# text up to the next bracket of json, skipping the strings, as brackets in strings are not structural
+JSON_BRACKET = re.compile(rb'[^\[\]{}"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^\[\]{}"]*)*(?:([\[{])|[\]}])')
+# folder & max size of the cache of parsed yaml files
+CACHE_DIR = os.environ.get('CONFIG_TUI_CACHE_DIR') or os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'config-tui')
+CACHE_SIZE = 512 << 20
+# placeholder of a span in json text, which is unique to this process
+SPAN_MARKER = f'\x00config-tui-span-{os.urandom(4).hex()}-'
+
+
+class PhaseProfiler:
+    """Records wall time & allocated memory blocks of each phase of a run (parse, tree build, edits, save...).
+
+    Phases are written on exit as json, or as a chrome trace which can be opened in chrome://tracing or Perfetto.
+    Does nothing when no output file is given.
+    """
+
+    def __init__(self, out_file: str = None, out_format: str = 'json') -> None:
+        self.out_file = out_file
+        self.out_format = out_format
+        self.enabled = out_file is not None
+        self.origin = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str, **details):
+        """Context manager to record a phase."""
+        if not self.enabled:
+            yield
+            return
+        start, blocks = time.perf_counter(), sys.getallocatedblocks()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), sys.getallocatedblocks() - blocks, **details)
+
+    def record(self, name: str, start: float, end: float, alloc_blocks: int = 0, **details) -> None:
+        """Record a phase which is already timed."""
+        if self.enabled:
+            self.phases.append({
+                'name': name,
+                'start': start - self.origin,
+                'duration': end - start,
+                'alloc_blocks': alloc_blocks,
+                'thread': threading.get_ident(),
+                **details
+            })
+
+    def dump(self) -> None:
+        """Write the recorded phases to the output file."""
+        if not self.enabled:
+            return
+        if self.out_format == 'chrome':
+            report = {'traceEvents': [
+                {
+                    'name': phase['name'], 'ph': 'X', 'pid': os.getpid(), 'tid': phase['thread'],
+                    'ts': phase['start'] * 1e6, 'dur': phase['duration'] * 1e6,
+                    'args': {k: v for k, v in phase.items() if k not in ('name', 'start', 'duration', 'thread')},
+                }
+                for phase in self.phases
+            ]}
+        else:
+            summary = {}
+            for phase in self.phases:
+                total = summary.setdefault(phase['name'], {'count': 0, 'duration': 0.0, 'alloc_blocks': 0})
+                total['count'] += 1
+                total['duration'] += phase['duration']
+                total['alloc_blocks'] += phase['alloc_blocks']
+            report = {'version': __version__, 'summary': summary, 'phases': self.phases}
+        with open(self.out_file, 'w') as out:
+            json.dump(report, out, indent=2, default=str)
+
+
+def round_trip_yaml() -> 'YAML':
+    """Yaml loader & dumper which preserves comments & formatting. ruamel.yaml is imported only for yaml files."""
+    from ruamel.yaml import YAML
+    yaml = YAML()               # by default, uses round-trip loader to load comments
+    yaml.indent(mapping=2)      # default indentation is 2 spaces
+    yaml.preserve_quotes = True
+    return yaml
+
+
+def detect_format(config_file: str, content: str) -> str:
+    """Guess the configuration type from file extension & content."""
+    ext = os.path.splitext(config_file)[1].lower()
+    if ext in ('.yaml', '.yml'):
+        return 'yaml'
+    if ext == '.json' or JSON_START.match(content):
+        return 'json'
+    return 'yaml'
+
+
+def parse_config(content: str, config_file: str, config_format: str, profiler: 'PhaseProfiler' = None) -> tuple:
+    """Parse the content of a configuration file using a single parser, unless the detected format fails.
+
+    Args:
+        config_format (str): Format as [auto, json, yaml]. The other format is tried if the detected one fails.
+
+    Returns:
+        config type (None if it is invalid) & data
+    """
+    profiler = profiler or PhaseProfiler()
+    if config_format == 'auto':
+        # try the detected format first & fallback to the other one only if it fails
+        detected = detect_format(config_file, content)
+        candidates = [detected, 'yaml' if detected == 'json' else 'json']
+    else:
+        candidates = [config_format]
+
+    for config_type in candidates:
+        try:
+            with profiler.phase('parse', config_type=config_type, size=len(content)):
+                if config_type == 'json':
+                    return config_type, json.loads(content)
+                if ROUND_TRIP_SYNTAX.search(content):
+                    # round-trip loader is slow, but required to preserve comments & formatting on save
+                    return config_type, round_trip_yaml().load(content)
+                # nothing to preserve, use the faster (libyaml based) safe loader
+                from ruamel.yaml import YAML
+                return config_type, YAML(typ='safe').load(content)
+        except:
+            pass
+    return None, None
+
+
+def cast_value(text: str, old_value=None, infer: bool = True) -> object:
+    """Convert the text of an edit to a value.
+
+    Args:
+        old_value: Value being replaced, whose type is kept unless the type is inferred.
+        infer (bool): Infer the type from the text, else cast it to the type of the old value.
+
+    Raises:
+        Exception if the text cannot be cast to the type of the old value
+    """
+    if infer:
+        exprsn = text
+    elif isinstance(old_value, str):
+        # keep it in quotes to evalute as string
+        exprsn = f'"{text}"'
+    else:
+        # cast value to it's originial type
+        exprsn = f"{type(old_value).__name__}({text})"
+    try:
+        # no globals, so that names of imported modules are kept as text, not evaluated to the modules
+        return eval(exprsn, {})
+    except Exception:
+        if infer:
+            return text     # keep the text as it is
+        raise
+
+
+def atomic_write(out_file: str, dump, backup: bool = False, mode: int = None) -> int:
+    """Write a file through a temporary file in the same folder, which replaces the file only once it is complete.
+
+    A failed write leaves the existing file untouched. Symbolic links are written through, not replaced.
+
+    Args:
+        out_file (str): File to be written.
+        dump (callable): Called with the opened temporary file to write the content.
+        backup (bool): Keep a copy of the existing file as <out_file>.bak.
+        mode (int): Permissions of the file. By default, those of the existing file or of a file created by open().
+
+    Returns:
+        number of bytes written
+    """
+    # temporary file is renamed to the target of the link, in the folder of the target
+    out_file = os.path.realpath(out_file)
+    out_dir = os.path.dirname(out_file)
+    fd, tmp_file = tempfile.mkstemp(dir=out_dir, prefix=f'.{os.path.basename(out_file)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', buffering=WRITE_BUFFER_SIZE) as out:
+            dump(out)
+            out.flush()
+            os.fsync(out.fileno())
+            size = os.fstat(out.fileno()).st_size
+        if backup and os.path.exists(out_file):
+            shutil.copy2(out_file, f'{out_file}.bak')
+        if hasattr(os, 'chown') and os.path.exists(out_file):
+            # keep the owner & group of the existing file, as a file owned by a service may be saved by root
+            stat = os.stat(out_file)
+            try:
+                os.chown(tmp_file, stat.st_uid, stat.st_gid)
+            except PermissionError:
+                pass        # only root can give away a file, others keep it only if they own it
+        if mode is not None:
+            os.chmod(tmp_file, mode)
+        elif os.path.exists(out_file):
+            # temporary files are private, keep the permissions of the existing file
+            shutil.copymode(out_file, tmp_file)
+        else:
+            # same permissions as a file created by open()
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_file, 0o666 & ~umask)
+        os.replace(tmp_file, out_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # persist the rename as well
+        dir_fd = os.open(out_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return size
+
+
+@lru_cache(maxsize=None)
+def load_orjson():
+    """orjson module if it is installed (optional, faster json encoder), else None. Imported on the first save."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def _escape_non_ascii_(match: re.Match) -> bytes:
+    """Helper function to escape utf-8 encoded characters as \\uXXXX, with surrogate pairs outside the BMP."""
+    escaped = []
+    for char in match.group().decode():
+        code = ord(char)
+        if code > 0xFFFF:
+            code -= 0x10000
+            escaped.append(f'\\u{0xD800 | code >> 10:04x}\\u{0xDC00 | code & 0x3FF:04x}')
+        else:
+            escaped.append(f'\\u{code:04x}')
+    return ''.join(escaped).encode()
+
+
+def _orjson_differs_(data: object) -> bool:
+    """Helper function to check for floats which orjson writes unlike json module: NaN & infinite, & exponent notation."""
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value) or 'e' in repr(value):
+                return True
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return False
+
+
+def dump_json(data: object, out) -> None:
+    """Write data as indented json, with orjson if it is installed. json module encodes in python when indenting.
+
+    Data which is not decoded from a memory-mapped file is copied as it is, through a placeholder in the json text.
+    """
+    spans = []
+
+    def encode_span(value) -> str:
+        if not isinstance(value, JsonSpan):
+            raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+        spans.append(value)
+        return f'{SPAN_MARKER}{len(spans) - 1}'
+
+    orjson = load_orjson()
+    if orjson is not None:
+        try:
+            content = orjson.dumps(data, default=encode_span, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            content = None      # types not supported by orjson, like integers over 64 bits
+        if content is not None and ORJSON_FLOATS.search(content) and _orjson_differs_(data):
+            content = None      # such floats are written by json module, so that the file does not depend on orjson
+        if content is None:
+            spans.clear()
+        else:
+            # same output as json module, which escapes non-ascii characters
+            content = NON_ASCII.sub(_escape_non_ascii_, content)
+            out.flush()
+            if not spans:
+                out.buffer.write(content)
+                return
+            placeholder = json.dumps(SPAN_MARKER)[:-1].encode()
+            pieces = re.split(re.escape(placeholder) + rb'(\d+)"', content)
+            for idx, piece in enumerate(pieces):
+                if idx % 2:
+                    spans[int(piece)].copy_to(out.buffer)
+                else:
+                    out.buffer.write(piece)
+            return
+
+    placeholder = json.dumps(SPAN_MARKER)[:-1]
+    for chunk in json.JSONEncoder(indent=2, default=encode_span).iterencode(data):
+        # placeholders are encoded as separate chunks
+        if spans and chunk.startswith(placeholder):
+            out.flush()
+            spans[int(chunk[len(placeholder):-1])].copy_to(out.buffer)
+        else:
+            out.write(chunk)
+
+
+class JsonSpan:
+    """Json container which is not decoded yet, as a range of bytes of a memory-mapped file."""
+
+    __slots__ = ('source', 'start', 'end')
+
+    def __init__(self, source: 'MappedJson', start: int, end: int) -> None:
+        self.source = source
+        self.start = start
+        self.end = end
+
+    @property
+    def kind(self) -> 'NodeType':
+        return NodeType.DICT if self.source.map[self.start] == ord('{') else NodeType.LIST
+
+    def decode(self) -> object:
+        """Decode the container, keeping its large nested containers as spans."""
+        return self.source.decode(self.start, self.end)
+
+    def copy_to(self, out) -> None:
+        """Write the bytes of the container to a binary file, in chunks."""
+        for pos in range(self.start, self.end, WRITE_BUFFER_SIZE):
+            out.write(self.source.map[pos:min(pos + WRITE_BUFFER_SIZE, self.end)])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, JsonSpan):
+            return NotImplemented
+        return self.end - self.start == other.end - other.start and \
+            self.source.map[self.start:self.end] == other.source.map[other.start:other.end]
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'<{self.end - self.start} bytes of json>'
+
+
+class MappedJson:
+    """Read-mostly backend of a json file, which is memory-mapped instead of being read.
+
+    A single scan records the byte ranges of containers larger than SPAN_MIN_SIZE. Containers are decoded with the
+    json parser only when they are needed, with their large nested containers kept as JsonSpan.
+    The file must be replaced (as on save), not rewritten in place, while it is mapped.
+    """
+
+    def __init__(self, file: str, progress=None, min_size: int = SPAN_MIN_SIZE) -> None:
+        progress = progress or (lambda title, done, total: None)
+        with open(file, 'rb') as conf:
+            stat = os.fstat(conf.fileno())
+            # raises ValueError for empty files
+            self.map = mmap.mmap(conf.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self.map)
+        digest = hashlib.blake2b(digest_size=16)
+        for pos in range(0, size, READ_CHUNK_SIZE):
+            digest.update(self.map[pos:pos + READ_CHUNK_SIZE])
+            progress('Reading', pos, size)
+        self.state = (stat.st_mtime_ns, stat.st_size, digest.digest())
+        self.min_size = min_size
+        self.starts, self.ends = array('q'), array('q')       # ranges of large containers, sorted by start
+        self._scan_(progress)
+
+    def _scan_(self, progress) -> None:
+        """Find the range of the root & of the large containers, by matching the brackets outside of strings."""
+        if re.match(rb'\s*[\[{]', self.map) is None:
+            raise ValueError('Not a json object or array')
+        ranges, stack, min_size = [], [], self.min_size
+        size, next_report, end = len(self.map), 0, 0
+        for match in JSON_BRACKET.finditer(self.map):
+            if match.start() != end:
+                # no bracket follows, as a string is not closed. Matches after it would start within the string
+                raise ValueError(f'Incomplete json at {end}')
+            end = match.end()
+            if match.lastindex:
+                stack.append(end - 1)
+                continue
+            if not stack:
+                raise ValueError(f'Unexpected bracket at {end - 1}')
+            start = stack.pop()
+            if self.map[start] + 2 != self.map[end - 1]:
+                # {} & [] are 2 apart in ascii
+                raise ValueError(f'Mismatched bracket at {end - 1}')
+            if not stack:
+                self.bounds = (start, end)
+                break
+            if end - start >= min_size:
+                ranges.append((start, end))
+            if end >= next_report:
+                progress('Scanning', end, size)
+                next_report = end + READ_CHUNK_SIZE
+        else:
+            raise ValueError('Incomplete json')
+        if self.map[end:].strip():
+            raise ValueError(f'Extra data at {end}')
+        ranges.sort()
+        self.starts.extend(start for start, _ in ranges)
+        self.ends.extend(end for _, end in ranges)
+
+    def root(self) -> object:
+        """Decode the root container."""
+        return self.decode(*self.bounds)
+
+    def decode(self, start: int, end: int) -> object:
+        """Decode the container at a range of bytes, with its large nested containers as spans.
+
+        Spans are replaced by placeholders in the text given to the json parser, so that the parser does all the work.
+        """
+        starts, ends = self.starts, self.ends
+        idx, last = bisect_right(starts, start), bisect_left(starts, end)
+        pieces, spans, pos = [], [], start
+        while idx < last:
+            # outer most containers in the range are its direct children
+            span = JsonSpan(self, starts[idx], ends[idx])
+            pieces.append(self.map[pos:span.start])
+            pieces.append(json.dumps(f'{SPAN_MARKER}{len(spans)}').encode())
+            spans.append(span)
+            pos = span.end
+            idx = bisect_left(starts, span.end, idx + 1, last)
+        pieces.append(self.map[pos:end])
+        data = json.loads(b''.join(pieces))
+        if spans:
+            marker = len(SPAN_MARKER)
+            for key, value in list(data.items() if isinstance(data, dict) else enumerate(data)):
+                if type(value) is str and value.startswith(SPAN_MARKER):
+                    data[key] = spans[int(value[marker:])]
+        return data
+
+
+def profiled(name: str):
+    """Decorator to record a method call as a phase, in the profiler of the app."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None) or self.app.profiler
+            with profiler.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ParseCache:
+    """On-disk cache of parsed yaml files, including comments, to skip parsing when unchanged files are opened again.
+
+    Documents are pickled, with a header which must match the modified time, size & hash of the file, the format
+    & the versions of ConfigTUI & ruamel.yaml. Least recently used entries are evicted beyond the max size.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_size: int = CACHE_SIZE) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def _entry_(self, config_file: str) -> tuple:
+        """File of the cache entry of a file, & the header identifying the file."""
+        from ruamel.yaml import __version__ as ruamel_version
+        config_file = os.path.abspath(config_file)
+        name = hashlib.blake2b(config_file.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f'{name}.pickle'), (__version__, ruamel_version, config_file)
+
+    def _trusted_(self, stat: os.stat_result) -> bool:
+        """Whether the folder or an entry of the cache is owned by the current user & not writable by others.
+
+        Loading a pickle can run any code, hence entries which others could have written are never loaded.
+        """
+        if not hasattr(os, 'getuid'):
+            return True         # no owner & permission bits on Windows, where the user's cache folder is private
+        return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+    def load(self, config_file: str, file_state: tuple, config_format: str):
+        """Get the config type & data of a file, or None if it is not cached or the file is changed."""
+        entry, header = self._entry_(config_file)
+        try:
+            if not self._trusted_(os.stat(self.cache_dir)):
+                return None
+            # links are not followed, so that the checked entry is the one which is loaded
+            with open(os.open(entry, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0)), 'rb') as cached:
+                if not self._trusted_(os.fstat(cached.fileno())):
+                    return None
+                # data is unpickled only if the header matches
+                if pickle.load(cached) != (*header, file_state, config_format):
+                    return None
+                loaded = pickle.load(cached)
+            os.utime(entry)         # mark as recently used
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # incomplete or incompatible entry
+            self._remove_(entry)
+            return None
+        return loaded
+
+    def store(self, config_file: str, file_state: tuple, config_format: str, loaded: tuple) -> None:
+        """Cache the config type & data of a file. Failures are ignored, as the cache is optional."""
+        entry, header = self._entry_(config_file)
+
+        def dump(out) -> None:
+            out.flush()
+            pickle.dump((*header, file_state, config_format), out.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(loaded, out.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+
+        try:
+            # mode is applied only to a new folder, an existing one must be private already
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            if not self._trusted_(os.stat(self.cache_dir)):
+                return
+            atomic_write(entry, dump, mode=0o600)
+            self._evict_()
+        except Exception:
+            pass
+
+    def _evict_(self) -> None:
+        """Remove least recently used entries beyond the max size."""
+        entries = []
+        with os.scandir(self.cache_dir) as files:
+            for file in files:
+                if file.name.endswith('.pickle'):
+                    stat = file.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, file.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove_(path)
+            total -= size
+
+    def _remove_(self, entry: str) -> None:
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+
+class NodeType(IntEnum):
+    """Type of data of a node."""
+    VALUE = 0
+    DICT = 1
+    LIST = 2
+
+
+class SearchIndex:
+    """Substring index over the keys, dotted paths and scalar values of a configuration.
+
+    Entries are stored in fixed size blocks. Every block keeps its entries joined into a single
+    lower-cased string, so that a lookup is a str.find (done in C) over a few large strings
+    instead of a walk over the tree. Updates split & re-join only the blocks they touch.
+
+    Entries are kept in document order: changed entries are replaced in place & shifted list elements are
+    renumbered in place. Blocks are compacted once removed entries outnumber the others.
+    """
+
+    BLOCK_SIZE = 4096
+
+    class Block:
+        __slots__ = ('paths', 'lines', 'texts')
+
+        def __init__(self) -> None:
+            self.paths = []             # path of each entry as a tuple of keys, None if entry is removed
+            self.lines = ([], [])       # searchable lines of entries as 'key\x1fvalue' & 'dotted.path\x1fvalue'
+            self.texts = None           # lines joined into a string, with offsets of each line
+
+        def edit(self) -> tuple:
+            """Lines of the block for making changes."""
+            if self.lines is None:
+                self.lines = tuple(text.split('\n') for text, _ in self.texts)
+            self.texts = None
+            return self.lines
+
+        def text(self, with_paths: bool) -> tuple:
+            """Joined text of lines, with offsets of each line in it."""
+            if self.texts is None:
+                self.texts = tuple(
+                    ('\n'.join(lines), array('q', accumulate((len(line) + 1 for line in lines), initial=0)))
+                    for lines in self.lines
+                )
+                self.lines = None
+            return self.texts[with_paths]
+
+    def __init__(self, data: object = None) -> None:
+        self.blocks = []
+        self.locations = {}     # path -> position of entry across blocks
+        self.removed = 0        # number of removed entries, which are still in the blocks
+        if data is not None:
+            self.add((), data)
+
+    def _entries_(self, path: tuple, data: object):
+        """Generate entries for the data at a path & all its nested data, in document order."""
+        key = str(path[-1]).lower() if path else ''
+        stack = [(path, key, '.'.join(map(str, path)).lower(), data)]
+        while stack:
+            path, key, dotted, data = stack.pop()
+            if isinstance(data, dict):
+                children = data.items()
+            elif isinstance(data, list):
+                children = enumerate(data)
+            elif isinstance(data, JsonSpan):
+                children = ()       # indexed once it is decoded
+            else:
+                children = None
+            if path:
+                value = '' if children is not None else f'\x1f{data}'.replace('\n', ' ').lower()
+                yield path, key + value, dotted + value
+            if children:
+                prefix = dotted + '.' if path else ''
+                stack.extend(reversed([
+                    (path + (child_key,), child_name, prefix + child_name, value)
+                    for child_key, child_name, value in ((k, str(k).lower(), v) for k, v in children)
+                ]))
+
+    def _paths_(self, path: tuple, data: object):
+        """Generate paths of the entries for the data at a path & all its nested data."""
+        stack = [(path, data)]
+        while stack:
+            path, data = stack.pop()
+            yield path
+            if isinstance(data, dict):
+                stack.extend((path + (key,), value) for key, value in data.items())
+            elif isinstance(data, list):
+                stack.extend((path + (idx,), value) for idx, value in enumerate(data))
+
+    def add(self, path: tuple, data: object) -> None:
+        """Index the data at a path, replacing any existing entries."""
+        blocks, locations, size = self.blocks, self.locations, self.BLOCK_SIZE
+        if not blocks or len(blocks[-1].paths) >= size:
+            blocks.append(self.Block())
+        block = blocks[-1]
+        paths, (key_lines, path_lines) = block.paths, block.edit()
+        position = (len(blocks) - 1) * size + len(paths)
+        for entry_path, key_line, path_line in self._entries_(path, data):
+            existing = locations.setdefault(entry_path, position)
+            if existing != position:
+                # replace an existing entry in place
+                block_no, idx = divmod(existing, size)
+                lines = blocks[block_no].edit()
+                lines[0][idx], lines[1][idx] = key_line, path_line
+                continue
+            paths.append(entry_path)
+            key_lines.append(key_line)
+            path_lines.append(path_line)
+            position += 1
+            if len(paths) >= size:
+                block = self.Block()
+                blocks.append(block)
+                paths, (key_lines, path_lines) = block.paths, block.lines
+
+    def remove(self, path: tuple, data: object) -> None:
+        """Remove entries of the data at a path."""
+        for entry_path in self._paths_(path, data):
+            self._discard_(entry_path)
+        if self.removed > max(len(self.locations), self.BLOCK_SIZE):
+            self._compact_()
+
+    def shift(self, path: tuple, elements, step: int) -> None:
+        """Renumber elements of the list at a path, in place, as their positions are shifted by step.
+
+        Args:
+            elements: (current index, data) of the elements, starting from the free end so that none is overwritten.
+        """
+        blocks, locations, size = self.blocks, self.locations, self.BLOCK_SIZE
+        prefix = '.'.join(map(str, path)).lower() + '.' if path else ''
+        for index, data in elements:
+            old_key, new_key = str(index), str(index + step)
+            cut, new_dotted = len(prefix) + len(old_key), prefix + new_key
+            stack = [(path + (index,), path + (index + step,), data)]
+            while stack:
+                entry_path, moved_path, data = stack.pop()
+                if isinstance(data, dict):
+                    stack.extend((entry_path + (key,), moved_path + (key,), value) for key, value in data.items())
+                elif isinstance(data, list):
+                    stack.extend((entry_path + (idx,), moved_path + (idx,), value) for idx, value in enumerate(data))
+                position = locations.pop(entry_path, None)
+                if position is None:
+                    continue        # nested data of a span, which is not indexed yet
+                locations[moved_path] = position
+                block = blocks[position // size]
+                idx = position % size
+                block.paths[idx] = moved_path
+                key_lines, path_lines = block.lines or block.edit()
+                block.texts = None
+                path_lines[idx] = new_dotted + path_lines[idx][cut:]
+                # only the key of the element itself changes, keys of its nested entries are the same
+                if len(moved_path) == len(path) + 1:
+                    key_lines[idx] = new_key + key_lines[idx][len(old_key):]
+
+    def _discard_(self, path: tuple) -> None:
+        position = self.locations.pop(path, None)
+        if position is not None:
+            block_no, idx = divmod(position, self.BLOCK_SIZE)
+            block = self.blocks[block_no]
+            block.paths[idx] = None
+            for lines in block.edit():
+                lines[idx] = ''
+            self.removed += 1
+
+    def _compact_(self) -> None:
+        """Helper function to drop the removed entries from the blocks, keeping the order of the others."""
+        blocks, locations, size = self.blocks, self.locations, self.BLOCK_SIZE
+        self.blocks, self.removed = [], 0
+        block = None
+        for old in blocks:
+            key_lines, path_lines = old.edit()
+            for entry_path, key_line, path_line in zip(old.paths, key_lines, path_lines):
+                if entry_path is None:
+                    continue
+                if block is None or len(block.paths) >= size:
+                    block = self.Block()
+                    self.blocks.append(block)
+                locations[entry_path] = (len(self.blocks) - 1) * size + len(block.paths)
+                block.paths.append(entry_path)
+                block.lines[0].append(key_line)
+                block.lines[1].append(path_line)
+
+    def search(self, query: str, limit: int = 100) -> list:
+        """Find paths whose key or value contains the query. Queries with a '.' are matched against full paths."""
+        query = query.lower().replace('\n', ' ')
+        if not query:
+            return []
+        with_paths = '.' in query
+        hits = []
+        for block in self.blocks:
+            text, offsets = block.text(with_paths)
+            pos = text.find(query)
+            while pos != -1:
+                idx = bisect_right(offsets, pos) - 1
+                hits.append(block.paths[idx])
+                if len(hits) >= limit:
+                    return hits
+                # continue from the next line, to report each entry once
+                pos = text.find(query, offsets[idx + 1])
+        return hits
+
+
+def count_nodes(data: object) -> int:
+    """Count the values in nested data, including the dicts/lists."""
+    count, stack = 0, [data]
+    while stack:
+        cur = stack.pop()
+        count += 1
+        if isinstance(cur, dict):
+            stack.extend(cur.values())
+        elif isinstance(cur, list):
+            stack.extend(cur)
+    return count
+
+
+class Delta:
+    """Reversible change of the data at a path.
+
+    Old value is ABSENT for an added key, & new value is ABSENT for a removed key. Position of a removed key is
+    kept, to add it back at the same place, along with the comment of a removed element of a yaml list (ruamel drops
+    it, unlike the comments of keys). A 'rename' delta has the old & new keys of the last key of the path.
+    """
+
+    __slots__ = ('op', 'path', 'old', 'new', 'position', 'comment')
+
+    def __init__(self, op: str, path: tuple, old, new, position: int = None, comment=None) -> None:
+        self.op = op
+        self.path = path
+        self.old = old
+        self.new = new
+        self.position = position
+        self.comment = comment
+
+    def inverse(self) -> 'Delta':
+        """Delta which reverts this delta."""
+        if self.op == 'rename':
+            return Delta('rename', self.path[:-1] + (self.new,), self.new, self.old)
+        return Delta('set', self.path, self.new, self.old, self.position, self.comment)
+
+    def to_patch(self) -> dict:
+        """Operation of a json patch (RFC 6902)."""
+        def pointer(path: tuple) -> str:
+            return ''.join('/' + str(key).replace('~', '~0').replace('/', '~1') for key in path)
+
+        if self.op == 'rename':
+            return {'op': 'move', 'from': pointer(self.path), 'path': pointer(self.path[:-1] + (self.new,))}
+        if self.old is ABSENT:
+            return {'op': 'add', 'path': pointer(self.path), 'value': self.new}
+        if self.new is ABSENT:
+            return {'op': 'remove', 'path': pointer(self.path)}
+        return {'op': 'replace', 'path': pointer(self.path), 'value': self.new}
+
+
+class EditJournal:
+    """Undo & redo history of changes, kept as deltas instead of copies of the data.
+
+    Each entry has the deltas of one change. Oldest entries are dropped once the values held by all entries
+    add up to more nodes than the limit.
+    """
+
+    def __init__(self, limit: int = 100000) -> None:
+        self.limit = limit
+        self.done = deque()     # entries as (deltas, number of nodes)
+        self.undone = []
+        self.size = 0
+        self.dropped = 0        # number of entries dropped due to the limit
+        self.changes = 0        # number of changes recorded, undone & redone, to detect edits
+
+    def record(self, deltas: list) -> None:
+        """Add the deltas of a change. Changes which were undone cannot be redone after this."""
+        self.size -= sum(size for _, size in self.undone)
+        self.undone.clear()
+        size = sum(count_nodes(delta.old) + count_nodes(delta.new) for delta in deltas)
+        self.done.append((deltas, size))
+        self.size += size
+        self.changes += 1
+        while self.size > self.limit and self.done:
+            self.size -= self.done.popleft()[1]
+            self.dropped += 1
+
+    def undo(self) -> list:
+        """Deltas to revert the last change, in the order to be applied."""
+        if not self.done:
+            return []
+        entry = self.done.pop()
+        self.undone.append(entry)
+        self.changes += 1
+        return [delta.inverse() for delta in reversed(entry[0])]
+
+    def redo(self) -> list:
+        """Deltas to apply the last reverted change again."""
+        if not self.undone:
+            return []
+        entry = self.undone.pop()
+        self.done.append(entry)
+        self.changes += 1
+        return entry[0]
+
+    def clear(self) -> None:
+        self.done.clear()
+        self.undone.clear()
+        self.size = self.dropped = 0
+
+    def to_patch(self) -> list:
+        """Changes which are not undone, as a json patch."""
+        return [delta.to_patch() for deltas, _ in self.done for delta in deltas]
+
+
+def split_path(path: str) -> list:
+    """Split a dotted path into keys. Dots within keys are escaped as '\\.'"""
+    return [key.replace('\\.', '.') for key in re.split(r'(?<!\\)\.', path)]
+
+
+def locate(data: object, keys: list) -> tuple:
+    """Find the dict/list holding the last key of a path, & the key in it.
+
+    Keys are matched as text, as numbers for lists & for the non-string keys of yaml. Last key of a dict may not exist.
+
+    Raises:
+        KeyError if the path does not exist
+    """
+    for pos, key in enumerate(keys):
+        if isinstance(data, list):
+            try:
+                key = int(key)
+                data[key]
+            except (ValueError, IndexError):
+                raise KeyError(key)
+        elif isinstance(data, dict):
+            if key not in data:
+                key = next((other for other in data if str(other) == key), key)
+        else:
+            raise KeyError(key)
+        if pos == len(keys) - 1:
+            return data, key
+        data = data[key]
+
+
+def batch_edit(config_file: str, operations: list, config_format: str = 'auto', infer: bool = True, backup: bool = False) -> tuple:
+    """Apply edits to a configuration file without the UI. Runs in a worker process for each file.
+
+    Values are converted like the edits in the UI, and yaml files are saved with their comments. File is saved only if
+    all edits are successful.
+
+    Args:
+        operations (list): (action, argument) of each edit. Action is one of [get, set, delete], & argument is
+            a dotted path, followed by '=value' for a set.
+
+    Returns:
+        boolean status whether all edits are successful, with a message of each edit
+    """
+    try:
+        with open(config_file, 'r') as conf:
+            content = conf.read()
+    except OSError as e:
+        return False, [f'Read failed. Error: {e}']
+    config_type, data = parse_config(content, config_file, config_format)
+    if config_type is None:
+        return False, ['Invalid configuration file. File must be a valid json/yaml file.']
+
+    status, changed, messages = True, False, []
+    for action, argument in operations:
+        path, _, text = argument.partition('=') if action == 'set' else (argument, '', '')
+        try:
+            parent, key = locate(data, split_path(path))
+            if action == 'get':
+                messages.append(f'{path} = {json.dumps(parent[key], default=str)}')
+            elif action == 'delete':
+                del parent[key]
+                messages.append(f'Deleted {path}')
+            elif isinstance(parent, dict) and key not in parent:
+                parent[key] = cast_value(text)          # type of new keys is always inferred
+                messages.append(f'Added {path} = {text}')
+            else:
+                parent[key] = cast_value(text, parent[key], infer)
+                messages.append(f'Updated {path} = {text}')
+            changed |= action != 'get'
+        except KeyError:
+            status = False
+            messages.append(f'{path} not found')
+        except Exception as e:
+            status = False
+            messages.append(f'INVALID VALUE for {path}. Error: {e}')
+
+    if status and changed:
+        def dump(out) -> None:
+            if config_type == 'yaml':
+                round_trip_yaml().dump(data, out)
+            else:
+                dump_json(data, out)
+
+        try:
+            size = atomic_write(config_file, dump, backup)
+        except Exception as e:
+            return False, messages + [f'Save failed. Error: {e}']
+        messages.append(f'Saved {size} bytes')
+    return status, messages
+
+
+def run_batch(files: list, operations: list, jobs: int = None, **options) -> int:
+    """Apply edits to many files in parallel worker processes, printing the result of each file.
+
+    Returns:
+        exit code, 0 if edits of all files are successful, else 1
+    """
+    from concurrent.futures import ProcessPoolExecutor      # slow to import, only needed by batch edits
+    work = partial(batch_edit, operations=operations, **options)
+    executor = None if jobs == 1 or len(files) == 1 else ProcessPoolExecutor(max_workers=jobs)
+    results = executor.map(work, files) if executor else map(work, files)
+    failed = 0
+    # results are printed in the order of the files, as they are completed
+    for config_file, (status, messages) in zip(files, results):
+        failed += not status
+        print(f"[{'OK' if status else 'FAILED'}] {config_file}")
+        for message in messages:
+            print(f'  {message}')
+    if len(files) > 1:
+        print(f'{len(files) - failed} of {len(files)} files edited successfully')
+    if executor:
+        executor.shutdown()
+    return 1 if failed else 0
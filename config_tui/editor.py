@@ -0,0 +1,1753 @@
+# Description: Tree view of configuration files in TUI, to view/edit them
+# Requires config-tui.css in the same folder level
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from itertools import chain, islice
+from typing import TYPE_CHECKING
+
+from rich.cells import cell_len
+from rich.style import Style
+from rich.text import Text
+from rich.highlighter import ReprHighlighter
+
+from textual import on
+from textual.app import App, ComposeResult
+from textual.binding import Binding
+from textual.containers import Grid
+from textual.screen import ModalScreen
+from textual.widgets import Button, Label, Footer, Input, OptionList, ProgressBar, TabbedContent, TabPane, Tree
+from textual.widgets.tree import TreeNode
+from textual.worker import Worker, WorkerState
+
+from core import (ABSENT, CHUNK_SIZE, EXPAND_LIMIT, READ_CHUNK_SIZE, Delta, EditJournal, JsonSpan, MappedJson, NodeType,
+                  PhaseProfiler, SearchIndex, atomic_write, cast_value, detect_format, dump_json, parse_config, profiled,
+                  round_trip_yaml)
+
+if TYPE_CHECKING:
+    from ruamel.yaml import YAML
+
+code_dir = os.path.dirname(os.path.abspath(__file__))
+CSS_FILE = os.path.join(code_dir, 'config-tui.css')
+# marker for labels without a value, as None is a valid value
+NO_VALUE = object()
+# seconds between the checks for changes of the file in watch mode
+WATCH_INTERVAL = 1.0
+# number of rendered labels to be cached
+LABEL_CACHE_SIZE = 8192
+# highlighter is stateless, hence shared by all labels
+REPR_HIGHLIGHTER = ReprHighlighter()
+
+
+class NodeData:
+    """Compact record of a node in the tree, instead of a dict per node.
+
+    Nested nodes refer to their dict/list, from which the children are added on first expand. Parent is the parent
+    of the tree node, and paths are built from the keys of the ancestors when needed.
+
+    Range groups of large dicts/lists refer to the dict/list too, with the bounds of their elements relative to the
+    parent group. Indices of list elements in a group are relative to the group, so that changes within a group
+    never renumber the elements of other groups.
+    """
+
+    __slots__ = ('key', 'kind', 'data', 'style', 'pending', 'bounds')
+
+    def __init__(self, key, data: object, style: str) -> None:
+        self.key = key
+        self.kind = NodeType.DICT if isinstance(data, dict) else NodeType.LIST if isinstance(data, list) \
+            else data.kind if isinstance(data, JsonSpan) else NodeType.VALUE
+        self.data = data            # value of a leaf, or the backing dict/list (or span) of a nested node
+        self.style = style
+        self.pending = None         # highlighter of the children which are not added yet
+        self.bounds = None          # (start, stop) positions of the elements of a range group
+
+    @property
+    def value(self):
+        """Value to be edited. Key of a nested node, as its data cannot be edited in place."""
+        return self.data if self.kind is NodeType.VALUE else self.key
+
+    @value.setter
+    def value(self, value) -> None:
+        if self.kind is NodeType.VALUE:
+            self.data = value
+        else:
+            self.key = value
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE, typed=True)
+def _highlight_label_(highlighter: str, key=None, value=NO_VALUE, delimiter: str = ': ') -> Text:
+    """Render & memoize label text. Returned text is shared, so it must be copied before changing it."""
+    if value is NO_VALUE:
+        # paint label of nested data
+        return Text(str(key), style=highlighter)
+    highlighted = REPR_HIGHLIGHTER(repr(value))
+    if key is None:
+        # paint label with only value
+        return highlighted
+    # paint label with both key and value
+    return Text.assemble((str(key), highlighter), delimiter, highlighted)
+
+
+def highlight_label(highlighter: str, key=None, value=NO_VALUE, delimiter: str = ': ') -> Text:
+    """Helper function to highlight label text."""
+    try:
+        return _highlight_label_(highlighter, key, value, delimiter)
+    except TypeError:
+        # unhashable values cannot be cached
+        return _highlight_label_.__wrapped__(highlighter, key, value, delimiter)
+
+
+class ConfigTree(Tree):
+    """Tree which renders the labels of nodes from their data, only when a line is painted."""
+
+    # shared placeholder label of all nodes
+    EMPTY_LABEL = Text()
+    # clicks on the expand icon are identified by this meta, same as in Tree
+    TOGGLE_STYLE = Style.from_meta({"toggle": True})
+
+    def __init__(self, *args, delimiter: str = ': ', **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.delimiter = delimiter
+
+    def process_label(self, label) -> Text:
+        if isinstance(label, str) and not label:
+            return self.EMPTY_LABEL
+        return super().process_label(label)
+
+    def range_start(self, node: TreeNode) -> int:
+        """Position of the first element of a range group in its dict/list, or 0 for other nodes."""
+        start = 0
+        while node.data.bounds is not None:
+            start += node.data.bounds[0]
+            node = node.parent
+        return start
+
+    def _label_parts_(self, node: TreeNode) -> tuple:
+        """Helper function to get the key & value to be displayed for a node."""
+        data = node.data
+        if data.bounds is not None:
+            start = self.range_start(node)
+            last = start + data.bounds[1] - data.bounds[0] - 1
+            return (f"[{start}..{last}]" if data.kind is NodeType.LIST else f"{{{start}..{last}}}"), NO_VALUE
+        key = data.key
+        parent = node.parent
+        if parent is not None and parent.data.bounds is not None and parent.data.kind is NodeType.LIST:
+            key += self.range_start(parent)
+        if data.kind is NodeType.DICT:
+            return f"{{}} {key}", NO_VALUE
+        elif data.kind is NodeType.LIST:
+            return f"[] {key}", NO_VALUE
+        return key, data.data
+
+    def render_label(self, node: TreeNode, base_style, style) -> Text:
+        if not node.data:
+            return super().render_label(node, base_style, style)
+        key, value = self._label_parts_(node)
+        node_label = highlight_label(node.data.style, key, value, self.delimiter).copy()
+        node_label.stylize(style)
+        if node.allow_expand:
+            prefix = ("▼ " if node.is_expanded else "▶ ", base_style + self.TOGGLE_STYLE)
+        else:
+            prefix = ("", base_style)
+        return Text.assemble(prefix, node_label)
+
+    def get_label_width(self, node: TreeNode) -> int:
+        # measure the plain text, instead of rendering labels of all lines in the tree
+        if not node.data:
+            return super().get_label_width(node)
+        key, value = self._label_parts_(node)
+        width = cell_len(str(key)) if value is NO_VALUE else cell_len(f'{key}{self.delimiter}{value!r}')
+        return width + (2 if node.allow_expand else 0)
+
+
+class AlertScreen(ModalScreen[bool]):
+    """Screen for a Dialog Box.
+
+    Returns:
+        boolean status of user's confirmation
+    """
+
+    CSS_PATH = CSS_FILE
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+        self.message = kwargs['message']
+
+    def compose(self) -> ComposeResult:
+        yield Grid(
+            Label(f"{self.message}", id="dialog-msg"),
+            Button("Yes", variant="success", id="yes"),
+            Button("No", variant="primary", id="no"),
+            id="dialog-box",
+        )
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == 'yes':
+            self.dismiss(True)
+        else:
+            self.dismiss(False)
+
+
+class SaveScreen(ModalScreen):
+    """Screen with a dialog to Save file as."""
+
+    CSS_PATH = CSS_FILE
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+        self.input_file = kwargs['input_file']
+        self.config_type = kwargs['config_type']
+        self.yml_obj = kwargs['yml_obj']
+        self.new_json_data = kwargs['data']
+        self.backup = kwargs.get('backup', False)
+
+    def compose(self) -> ComposeResult:
+        self.out_file_name = Input(placeholder="Enter file name...", id="save-input", value=self.input_file)
+        self.out_file_name.border_title = 'Save as'
+        yield Grid(
+            self.out_file_name,
+            Button("Save", variant="success", id="yes"),
+            Button("Cancel", variant="primary", id="no"),
+            id="dialog-box",
+        )
+
+    def save_file(self) -> Worker:
+        """Save the configuration in background & exit once it is saved. Returns the worker of the save."""
+        self._set_busy_(True)
+        self.out_file_name.border_subtitle = 'Saving...'
+        # app is not reachable from the worker thread
+        work = partial(self._save_worker_, self.app.profiler, self.out_file_name.value)
+        return self.run_worker(work, group='save', exclusive=True)
+
+    def _save_worker_(self, profiler: PhaseProfiler, out_file: str) -> tuple:
+        """Worker to write the configuration in a thread, so that the UI is not blocked by large dumps.
+
+        Returns:
+            boolean status whether save is successful, with a message of its throughput or error
+        """
+        def dump(out) -> None:
+            if self.config_type == 'yaml':
+                self.yml_obj.dump(self.new_json_data, out)
+            elif self.config_type == 'json':
+                dump_json(self.new_json_data, out)
+
+        start = time.perf_counter()
+        try:
+            size = atomic_write(out_file, dump, self.backup)
+        except Exception as e:
+            return False, f'Save failed. Error: {e}'
+        elapsed = time.perf_counter() - start
+        profiler.record('save', start, start + elapsed, size=size)
+        rate = size / elapsed / (1 << 20) if elapsed else 0
+        return True, f'Configuration file exported successfully as [{out_file}] ({size / (1 << 20):.2f} MB in {elapsed:.2f} s, {rate:.1f} MB/s)'
+
+    def _set_busy_(self, busy: bool) -> None:
+        """Helper function to disable the dialog while saving."""
+        self.out_file_name.disabled = busy
+        for button in self.query(Button):
+            button.disabled = busy
+
+    def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
+        if event.state != WorkerState.SUCCESS:
+            return
+        status, message = event.worker.result
+        if status:
+            self.dismiss((self.out_file_name.value, message))
+        else:
+            # existing file is untouched, allow to retry
+            self._set_busy_(False)
+            self.out_file_name.border_subtitle = Text(message)
+            self.out_file_name.focus()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == 'no':
+            self.app.pop_screen()
+        else:
+            self.save_file()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        event.stop()
+        self.save_file()
+
+
+class EditSession:
+    """Edit state of a file opened in the editor. Each file opened in a tab has its own tree, data & undo history."""
+
+    __slots__ = ('config_file', 'patch_file', 'config_type', 'json_data', 'search_index', 'file_state', 'ignored_stat',
+                 'reloading', 'modified', 'highlighted', 'journal', 'json_tree', 'progress_bar', 'cur_node', 'loading')
+
+    def __init__(self, config_file: str, undo_limit: int) -> None:
+        self.config_file = config_file
+        self.patch_file = f'{config_file}.patch.json'
+        # type, data & search index of the configuration, once it is loaded
+        self.config_type = None
+        self.json_data = None
+        self.search_index = None
+        # modified time, size & hash of the loaded file, & unsaved changes in memory
+        self.file_state = None
+        self.ignored_stat = None
+        # a changed file is being parsed in background, to be reloaded once
+        self.reloading = False
+        self.modified = False
+        # nodes highlighted as changed
+        self.highlighted = set()
+        # history of changes for undo/redo, limited to a number of nodes in the changed values
+        self.journal = EditJournal(undo_limit)
+        # widgets of the file, created with the UI
+        self.json_tree = None
+        self.progress_bar = None
+        self.cur_node = None
+        # file is loaded in background, only a few actions are available till then
+        self.loading = False
+
+
+class SessionField:
+    """Attribute of the editor, which is kept in the edit session of the active file."""
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, editor, owner=None):
+        return self if editor is None else getattr(editor.session, self.name)
+
+    def __set__(self, editor, value) -> None:
+        setattr(editor.session, self.name, value)
+
+
+class ConfigurationEditor(App):
+
+    # TITLE = 'Configuration Editor'
+    # SUB_TITLE = 'Edit your configuration files'
+
+    BINDINGS = [
+        ("o", "toggle_dark", "Toggle dark mode"),
+        ("slash", "search", "Search"),
+        Binding("escape", "cancel", "Cancel", show=False),
+        ("x", "toggle", "Expand/Collapse All"),
+        *[Binding(str(level), f"expand_level({level})", f"Expand to level {level}", show=False) for level in range(1, 10)],
+        ("i", "insert_node", "Insert Node"),
+        ("d", "delete_node", "Delete Node"),
+        ("e", "edit", "Edit Value"),
+        ("u", "undo", "Undo"),
+        ("y", "redo", "Redo"),
+        Binding("j", "export_patch", "Export changes as json patch", show=False),
+        ("r", "reload", "Reload"),
+        ("s", "save", "Save"),
+        ("q", "quit", "Quit"),
+        Binding("t", "next_file", "Next file", show=False),
+        Binding("T", "next_file(-1)", "Previous file", show=False),
+    ]
+
+    CSS_PATH = CSS_FILE
+
+    # state of the active file, kept by the edit session of each file
+    config_file = SessionField()
+    patch_file = SessionField()
+    config_type = SessionField()
+    json_data = SessionField()
+    search_index = SessionField()
+    file_state = SessionField()
+    ignored_stat = SessionField()
+    reloading = SessionField()
+    modified = SessionField()
+    highlighted = SessionField()
+    journal = SessionField()
+    json_tree = SessionField()
+    progress_bar = SessionField()
+    cur_node = SessionField()
+    loading = SessionField()
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+        # each file is opened in a tab with its own edit session, the active one is shown
+        config_files = kwargs.get('config_files') or [kwargs['config_file']]
+        self.sessions = [EditSession(config_file, kwargs.get('undo_limit') or 100000) for config_file in config_files]
+        self.session = self.sessions[0]
+        # yaml files are parsed in processes when many files are loaded, created on mount
+        self.pool = None
+        # memory-map json files & decode nested data only when it is needed, which implies lazy loading
+        self.memory_map = kwargs.get('memory_map', False)
+        # populate nested nodes only when they are expanded for the first time
+        self.lazy_load = kwargs.get('lazy_load', False) or self.memory_map
+        # depth to be expanded by expand all, None to expand all levels
+        self.expand_level = kwargs.get('expand_level')
+        # nodes to be expanded before asking to expand the rest, 0 to disable
+        self.expand_limit = kwargs.get('expand_limit', EXPAND_LIMIT)
+        # dicts/lists larger than this are shown in range groups of this size, nested if needed. 0 to disable
+        chunk_size = kwargs.get('chunk_size', CHUNK_SIZE)
+        self.chunk_size = max(chunk_size, 2) if chunk_size > 0 else sys.maxsize
+        # nodes to be expanded/collapsed per refresh of the UI, & the running expand/collapse
+        self.fold_batch = 5000
+        self.fold_task = None
+        # files are loaded in background, only a few actions are available till then
+        self.loading_actions = ('quit', 'toggle_dark', 'cancel', 'next_file')
+        # delimiter to be dispayed in labels of tree
+        self.delimiter = ': '
+        # label highlighers in tree
+        self.default_highlight = 'bold'
+        self.edit_highlight = 'bold italic yellow'
+        self.insert_highlight = 'bold italic green'
+        self.delete_highlight = 'bold italic red'
+        # placeholders for edit fields
+        self.edit_node_help = "Select a node and press 'E' to edit..."
+        self.add_node_help = "Provide input in json/dict format. [Ex: {'key1': 'val1', 'key2': [1, 2]}]"
+        self.search_help = "Search keys & values. Include a '.' to search full paths [Ex: config.param]"
+        self.invalid_file_msg = 'Invalid configuration file. File must be a valid json/yaml file.'
+        # max number of search results to be listed
+        self.search_limit = 100
+        self.search_hits = []
+        # yaml dumper, created on the first save of a yaml file
+        self._yaml = None
+        # format of configuration to be loaded as [auto, json, yaml]
+        self.config_format = kwargs.get('config_format', 'auto')
+        # timings of phases, disabled by default
+        self.profiler = kwargs.get('profiler') or PhaseProfiler()
+        # cache of parsed yaml files, disabled by default
+        self.cache = kwargs.get('cache')
+        # keep a copy of the original file on save
+        self.backup = kwargs.get('backup', False)
+        # reload the files when they are changed by another process
+        self.auto_reload = kwargs.get('auto_reload', False)
+        # allow editing keys with nested data
+        self.edit_dict_keys = kwargs.get('edit_dict_keys', False)
+        # type of edited values is inferred from the input, unless the type of the old value is enforced
+        self.infer_types = not kwargs.get('strict_types', False)
+
+    def compose(self) -> ComposeResult:
+        self.edit_box = Input(placeholder=self.edit_node_help, id="edit-node")
+        self.edit_box.border_title = Text.from_markup('Enter your value [italic](press enter to save)[/]')
+        for session in self.sessions:
+            session.json_tree = ConfigTree('ROOT', delimiter=self.delimiter)
+            session.progress_bar = ProgressBar(id="progress")
+        self.search_box = Input(placeholder=self.search_help, id="search")
+        self.search_box.border_title = Text.from_markup('Search [italic](press esc to close)[/]')
+        self.search_results = OptionList(id="search-results")
+        yield Label("Configuration Editor", id='header')
+        yield Footer()
+        yield self.search_box
+        yield self.search_results
+        if len(self.sessions) == 1:
+            yield self.json_tree
+            yield self.progress_bar
+        else:
+            with TabbedContent(id='files'):
+                for index, session in enumerate(self.sessions):
+                    yield TabPane(Text(session.config_file), session.json_tree, session.progress_bar, id=f'file-{index}')
+        yield self.edit_box
+
+    def on_mount(self) -> None:
+        """Load the files in background when the app starts."""
+        self.edit_box.disabled = True
+        self.json_tree.focus()
+        cpus = os.cpu_count() or 1
+        if len(self.sessions) > 1 and cpus > 1:
+            # threads parsing yaml files would run one at a time due to the GIL, hence they are parsed in processes.
+            # processes are spawned, as forking while threads of the UI are running may deadlock
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor      # slow to import, only needed for many files
+            self.pool = ProcessPoolExecutor(min(len(self.sessions), cpus), multiprocessing.get_context('spawn'))
+        for session in self.sessions:
+            # read & parse the files concurrently in threads, the trees are filled in later on the UI thread
+            with self._use_session_(session):
+                self.cur_node = self.json_tree.root
+                self.loading = True
+                self._show_progress_('Loading', os.path.getsize(self.config_file), 'press q to quit')
+            self.run_worker(partial(self._load_worker_, session), group='load')
+        if self.auto_reload:
+            self.set_interval(WATCH_INTERVAL, self._check_file_)
+        # time till the app is painted for the first time, since the app is created
+        self.call_after_refresh(lambda: self.profiler.record('first_paint', self.profiler.origin, time.perf_counter()))
+
+    def on_unmount(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @contextmanager
+    def _use_session_(self, session: EditSession):
+        """Helper context to work on the state of a file, which may not be the active one (like a file loaded in background)."""
+        active, self.session = self.session, session
+        try:
+            yield
+        finally:
+            self.session = active
+
+    def _load_worker_(self, session: EditSession) -> None:
+        """Worker to read & parse a file in a thread, so that the UI is shown & responsive meanwhile."""
+        def show_progress(title: str, done: int, total: int) -> None:
+            with self._use_session_(session):
+                self._show_progress_(title, total, 'press q to quit', done)
+
+        loaded = self._load_config_(session.config_file, lambda *args: self.call_from_thread(show_progress, *args))
+        self.call_from_thread(self._loaded_, session, *loaded)
+
+    def _loaded_(self, session: EditSession, config_type: str, data: object, file_state: tuple, search_index: SearchIndex) -> None:
+        """Helper function to keep the loaded file in its session & build its tree, on the UI thread."""
+        if config_type is None:
+            # other files can still be edited, actions on this file remain disabled
+            self._invalid_file_(session)
+            return
+        session.config_type, session.json_data, session.file_state, session.search_index = config_type, data, file_state, search_index
+        self.run_worker(self._fill_tree_(session), group='load')
+
+    def _invalid_file_(self, session: EditSession) -> None:
+        """Helper function to exit on an invalid file, or to show the error in its tab if other files are open."""
+        if len(self.sessions) == 1:
+            self.exit(result=1, message=self.invalid_file_msg)
+            return
+        session.progress_bar.border_title = Text(f'{self.invalid_file_msg} [{session.config_file}]')
+        session.progress_bar.display = True
+
+    async def _fill_tree_(self, session: EditSession) -> None:
+        """Worker to build the tree of a file in batches, on the event loop of the UI. Top levels are shown first."""
+        start = time.perf_counter()
+        root, progress_bar = session.json_tree.root, session.progress_bar
+        with self._use_session_(session):
+            self._show_progress_('Building tree', len(self.search_index.locations), 'press q to quit')
+            self.update_tree(self.config_type.upper(), root, self.json_data, self.default_highlight, populate=False)
+        root.expand()
+        for done in self._build_nodes_(root):
+            progress_bar.progress = done
+            # let the UI handle the pending events & repaint before the next batch
+            await asyncio.sleep(0)
+        self.profiler.record('tree_build', start, time.perf_counter(), nodes=progress_bar.progress)
+        progress_bar.display = False
+        session.loading = False
+
+    def _build_nodes_(self, node: TreeNode):
+        """Generator to add the deferred children of a node & of the nodes below it (unless loaded lazily), breadth first.
+        Yields number of nodes added after each batch.
+        """
+        done, next_batch = 0, self.fold_batch
+        queue = deque([node])
+        while queue:
+            cur = queue.popleft()
+            pending, cur.data.pending = cur.data.pending, None
+            if pending is not None:
+                self._add_children_(cur, cur.data.data, pending, populate=False)
+                done += len(cur.children)
+                if not self.lazy_load:
+                    # elements of range groups are added only when a group is expanded
+                    queue.extend(child for child in cur.children if child.allow_expand and child.data.bounds is None)
+            if done >= next_batch:
+                yield done
+                next_batch = done + self.fold_batch
+        yield done
+
+    def _show_progress_(self, title: str, total: int = None, hint: str = 'press esc to cancel', done: int = 0) -> None:
+        """Helper function to show the progress bar, with an unknown total if None."""
+        self.progress_bar.total = total
+        self.progress_bar.progress = done
+        self.progress_bar.border_title = Text.from_markup(f'{title} [italic]({hint})[/]')
+        self.progress_bar.display = True
+
+    async def run_action(self, action, default_namespace=None) -> bool:
+        # actions of the app need the loaded configuration, except a few
+        if self.loading and default_namespace in (None, self) and action.split('(')[0] not in self.loading_actions:
+            return False
+        return await super().run_action(action, default_namespace)
+
+    def _highlight_node_(self, node: TreeNode, highlighter=None) -> None:
+        """Helper function to repaint a node, optionally with a new highlighter.
+
+        Labels are rendered from node data when painted, so this only marks the node as changed.
+        """
+        if highlighter is not None:
+            node.data.style = highlighter
+            self.highlighted.add(node)
+        node.set_label('')
+        self.json_tree.refresh()
+
+    def _get_abs_key_(self, node: TreeNode) -> list:
+        """Helper function to build the complete path of a node as a list of keys.
+
+        Paths are derived from the keys of the ancestors, so they never go stale on renames or renumbering. Path of a
+        range group is the path of its dict/list.
+        """
+        abs_key = []
+        while not node.is_root:
+            data = node.data
+            if data.bounds is None:
+                abs_key.append(data.key)
+            elif abs_key and data.kind is NodeType.LIST:
+                # indices of list elements are relative to their range group
+                abs_key[-1] += data.bounds[0]
+            node = node.parent
+        abs_key.reverse()
+        return abs_key
+
+    def _traverse_yaml_data_(self, keys: list) -> object:
+        """Helper function to traverse the yaml data for a given list of keys
+
+        Returns the corresponding object
+        """
+        current_dict = self.json_data
+        for key in keys:
+            current_dict = current_dict[key]
+
+        return current_dict
+
+    def _update_yaml_(self, new_value, action, node: TreeNode = None, record: bool = True) -> bool:
+        """Helper function to update the in-memory yaml/json & its search index
+
+        Data is updated through the dict/list bound to the node & its parent, without traversing from the root.
+        Changes are recorded in the journal for undo, unless they are made by an undo/redo.
+
+        Returns: True if update is successful, else False
+        """
+        node = node or self.cur_node
+        path = tuple(self._get_abs_key_(node))
+        index = self.search_index
+        self.modified = True
+
+        if action == 'insert':                              # handle addition of new elements
+            target = node.data.data
+            if isinstance(target, dict):
+                deltas = [Delta('set', path + (key,), target.get(key, ABSENT), value) for key, value in new_value.items()]
+                for key in new_value:
+                    if key in target:
+                        index.remove(path + (key,), target[key])
+                target.update(new_value)
+                for key, value in new_value.items():
+                    index.add(path + (key,), value)
+            elif isinstance(target, list):
+                deltas = [Delta('set', path + (len(target),), ABSENT, new_value)]
+                index.add(path + (len(target),), new_value)
+                target.append(new_value)
+            else:
+                deltas = [Delta('set', path, target, new_value)]
+                node.parent.data.data[path[-1]] = new_value
+                index.add(path, new_value)
+        else:
+            current_dict = node.parent.data.data
+            last_key = path[-1]
+
+            if action == 'edit':
+                if node.data.kind is NodeType.DICT:             # handle nested key changes
+                    deltas = [Delta('rename', path, last_key, new_value)]
+                    index.remove(path, current_dict[last_key])
+                    self._rename_key_(current_dict, last_key, new_value)
+                    index.add(path[:-1] + (new_value,), current_dict[new_value])
+                else:                                           # handle normal leaf-level key changes
+                    deltas = [Delta('set', path, current_dict[last_key], new_value)]
+                    current_dict[last_key] = new_value
+                    index.add(path, new_value)
+            elif action == 'delete':                            # handle deletion of an existing element
+                if isinstance(current_dict, list):
+                    position, comments = last_key, getattr(current_dict, 'ca', None)
+                    comment = comments.items.get(last_key) if comments is not None else None
+                else:
+                    position, comment = list(current_dict).index(last_key), None
+                deltas = [Delta('set', path, current_dict[last_key], ABSENT, position, comment)]
+                index.remove(path, current_dict.pop(last_key))
+                if isinstance(current_dict, list):
+                    # elements after the deleted one are shifted by one position
+                    index.shift(path[:-1], ((idx + 1, current_dict[idx]) for idx in range(last_key, len(current_dict))), -1)
+
+        if record:
+            self.journal.record(deltas)
+        return True
+
+    def _insert_key_(self, mapping: dict, key, value, position: int) -> None:
+        """Helper function to add a key at a position of a mapping."""
+        if hasattr(mapping, 'insert'):
+            # CommentedMap of yaml, which keeps the comments of the key
+            mapping.insert(position, key, value)
+            return
+        tail = list(mapping)[position:]
+        mapping[key] = value
+        for old_key in tail:
+            mapping[old_key] = mapping.pop(old_key)
+
+    def _rename_key_(self, mapping: dict, old_key, new_key) -> None:
+        """Helper function to rename a key in-place, preserving its position & attached comments.
+
+        Only the keys after the renamed key are moved back to the end, using O(1) operations done in C.
+        """
+        # collect keys after the renamed key. scan from the end, as CommentedMap iterates in python
+        tail = []
+        for key in reversed(mapping):
+            if key == old_key:
+                break
+            tail.append(key)
+
+        value = mapping[old_key]
+        del mapping[old_key]
+        mapping[new_key] = value            # new key is inserted at the end
+        if isinstance(mapping, OrderedDict):
+            # CommentedMap is an OrderedDict
+            for key in reversed(tail):
+                mapping.move_to_end(key)
+        else:
+            for key in reversed(tail):
+                mapping[key] = mapping.pop(key)
+
+        # comments of ruamel types are tracked by key name
+        comments = getattr(mapping, 'ca', None)
+        if comments is not None and old_key in comments.items:
+            comments.items[new_key] = comments.items.pop(old_key)
+
+    def _editable_(self, data: NodeData) -> bool:
+        """Helper function to check whether the value (or the key of nested data) of a node can be edited."""
+        if data.bounds is not None:
+            return False
+        return self.edit_dict_keys if data.kind is NodeType.DICT else data.kind is NodeType.VALUE
+
+    def _invalid_input_handler_(self, err_msg) -> None:
+        """Handle error inputs in edit field."""
+        self.edit_box.border_subtitle = f'{err_msg}'
+        self.edit_box.styles.animate(attribute='background', value='red', duration=1.0, final_value=None)
+
+    def update_tree(self, name: str, node: TreeNode, data: object, highlighter, populate: bool = True) -> None:
+        """Adds a node to the tree.
+
+        Args:
+            name (str): Name of the node.
+            node (TreeNode): Parent node.
+            data (object): Data associated with the node.
+            populate (bool): Add the children of nested data now. If False, they are added on first expand.
+        """
+
+        # labels are rendered from the node data only when painted
+        node.data = NodeData(name, data, highlighter)
+        if node.data.kind is NodeType.VALUE:
+            node.allow_expand = False
+            return
+
+        if populate or not data:
+            self._add_children_(node, data, highlighter)
+        else:
+            # defer creation of children till the node is expanded
+            node.data.pending = highlighter
+
+    def _add_children_(self, node: TreeNode, data: object, highlighter, populate: bool = None) -> None:
+        """Helper function to add the children of nested data (or of a range group of it) under a node.
+
+        Dicts/lists larger than the chunk size are split into range groups, whose elements are added on first expand.
+        """
+        # nested nodes are populated on expand in lazy mode
+        if populate is None:
+            populate = not self.lazy_load
+        if isinstance(data, JsonSpan):
+            data = self._decode_span_(node, data)
+        bounds = node.data.bounds
+        size = len(data) if bounds is None else bounds[1] - bounds[0]
+        if size > self.chunk_size:
+            # groups are nested when there are more groups than the chunk size
+            span = self.chunk_size
+            while size > span * self.chunk_size:
+                span *= self.chunk_size
+            for start in range(0, size, span):
+                group = node.add("")
+                group.data = NodeData(None, data, highlighter)
+                group.data.bounds = (start, min(start + span, size))
+                group.data.pending = highlighter
+            return
+        start = node.tree.range_start(node)
+        if isinstance(data, dict):
+            items = data.items() if bounds is None else islice(data.items(), start, start + size)
+            for key, value in items:
+                new_node = node.add("")
+                self.update_tree(key, new_node, value, highlighter, populate)
+        else:
+            # indices are relative to the range group
+            for index, value in enumerate(data if bounds is None else islice(data, start, start + size)):
+                new_node = node.add("")
+                self.update_tree(index, new_node, value, highlighter, populate)
+
+    def _decode_span_(self, node: TreeNode, span: JsonSpan) -> object:
+        """Helper function to decode the data of a node from the memory-mapped file, replacing its span."""
+        with self.profiler.phase('decode', size=span.end - span.start):
+            data = span.decode()
+        path = tuple(self._get_abs_key_(node))
+        node.parent.data.data[path[-1]] = data
+        node.data.data = data
+        self.search_index.remove(path, span)
+        self.search_index.add(path, data)
+        return data
+
+    def _load_children_(self, node: TreeNode) -> bool:
+        """Helper function to add the deferred children of a lazy node.
+
+        Returns:
+            False if the data of the node is not valid json of a memory-mapped file, else True
+        """
+        data = node.data
+        if data is not None and data.pending is not None:
+            highlighter, data.pending = data.pending, None
+            try:
+                self._add_children_(node, data.data, highlighter)
+            except ValueError as e:
+                # parts of memory-mapped files are validated when they are decoded
+                data.pending = highlighter
+                self._invalid_input_handler_(f'INVALID JSON. Error: {e}')
+                return False
+        return True
+
+    def _load_all_(self, node: TreeNode) -> None:
+        """Helper function to add the deferred children of all lazy nodes under a node."""
+        stack = [node]
+        while stack:
+            cur = stack.pop()
+            self._load_children_(cur)
+            stack.extend(child for child in cur.children if child.allow_expand)
+
+    def _read_file_(self, config_file: str, progress=None) -> tuple:
+        """Helper function to read a file. Returns content & the modified time, size & hash of the file, to detect changes."""
+        progress = progress or (lambda title, done, total: None)
+        digest = hashlib.blake2b(digest_size=16)
+        with self.profiler.phase('read'), open(config_file, 'r') as conf:
+            stat = os.fstat(conf.fileno())
+            chunks = []
+            while True:
+                chunk = conf.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                digest.update(chunk.encode())
+                progress('Reading', conf.buffer.tell(), stat.st_size)
+            content = ''.join(chunks)
+            del chunks
+        return content, (stat.st_mtime_ns, stat.st_size, digest.digest())
+
+    @property
+    def yaml(self) -> 'YAML':
+        """Round-trip yaml to save the configuration, ruamel.yaml is not imported for json files."""
+        if self._yaml is None:
+            self._yaml = round_trip_yaml()
+        return self._yaml
+
+    def _parse_file_(self, config_file: str, content: str, file_state: tuple) -> tuple:
+        """Helper function to parse the file content, unless it is cached. Returns config type (None if it is invalid) & data."""
+        # only yaml files are cached, so that json files are loaded without ruamel.yaml
+        config_format = self.config_format if self.config_format != 'auto' else detect_format(config_file, content)
+        if self.cache is not None and config_format == 'yaml':
+            with self.profiler.phase('cache_load'):
+                loaded = self.cache.load(config_file, file_state, self.config_format)
+            if loaded is not None:
+                return loaded
+        if self.pool is not None and config_format == 'yaml':
+            # pure python parser, run in a process to parse many files in parallel
+            with self.profiler.phase('parse', config_type=config_format, size=len(content), process=True):
+                loaded = self.pool.submit(parse_config, content, config_file, self.config_format).result()
+        else:
+            loaded = parse_config(content, config_file, self.config_format, self.profiler)
+        # json parser is faster than unpickling
+        if self.cache is not None and loaded[0] == 'yaml':
+            with self.profiler.phase('cache_store'):
+                self.cache.store(config_file, file_state, self.config_format, loaded)
+        return loaded
+
+    def _load_config_(self, config_file: str, progress=None) -> tuple:
+        """Helper function to read, parse & index a file. Runs in worker threads, hence it does not change the editor.
+
+        Args:
+            progress (callable): Called with title, done & total (None if unknown) of each step, if given.
+
+        Returns:
+            config type (None if it is invalid), data, file state & search index
+        """
+        progress = progress or (lambda title, done, total: None)
+        mapped = self._map_file_(config_file, progress) if self.memory_map else None
+        if mapped is not None:
+            config_type, (data, file_state) = 'json', mapped
+        else:
+            try:
+                content, file_state = self._read_file_(config_file, progress)
+            except (OSError, UnicodeDecodeError):
+                return None, None, None, None       # unreadable, or not a text file
+            progress('Parsing', 0, None)
+            config_type, data = self._parse_file_(config_file, content, file_state)
+            if config_type is None:
+                return None, None, file_state, None
+
+        progress('Indexing', 0, None)
+        with self.profiler.phase('index'):
+            search_index = SearchIndex(data)
+            search_index.search(' ')        # join the text of blocks upfront, for a quick first search
+        return config_type, data, file_state, search_index
+
+    def load_file(self, progress=None) -> bool:
+        """Load the YAML file of the active session as JSON. Returns False if it is not a valid configuration.
+
+        Args:
+            progress (callable): Called with title, done & total (None if unknown) of each step, if given.
+        """
+        config_type, data, file_state, search_index = self._load_config_(self.config_file, progress)
+        if config_type is None:
+            return False
+        self.config_type, self.json_data, self.file_state, self.search_index = config_type, data, file_state, search_index
+        self.modified = False
+        return True
+
+    def _map_file_(self, config_file: str, progress=None) -> tuple:
+        """Helper function to load a json file through a memory-map, decoding only its top level.
+
+        Returns:
+            data & state of the file, or None if it is not a json file
+        """
+        ext = os.path.splitext(config_file)[1].lower()
+        if self.config_format == 'yaml' or self.config_format == 'auto' and ext in ('.yaml', '.yml'):
+            return None
+        try:
+            with self.profiler.phase('read'):
+                mapped = MappedJson(config_file, progress)
+            with self.profiler.phase('parse', config_type='json', size=mapped.state[1]):
+                data = mapped.root()
+        except (ValueError, OSError):
+            return None         # not a json file (or not readable), which is loaded as usual
+        return data, mapped.state
+
+    def _file_stat_(self) -> tuple:
+        """Helper function to get the modified time & size of the file."""
+        stat = os.stat(self.config_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_changes_(self, config_file: str, modified: bool, file_state: tuple) -> tuple:
+        """Helper function to re-read a file, unless it is unchanged on disk & in memory.
+
+        Returns:
+            new state of the file, & config type (None if it is invalid) & data of the file or None if nothing changed
+        """
+        mapped = self._map_file_(config_file) if self.memory_map else None
+        try:
+            if mapped is not None:
+                data, new_state = mapped
+            else:
+                content, new_state = self._read_file_(config_file)
+        except (OSError, UnicodeDecodeError):
+            # handled like an invalid file, & read again only once it is changed
+            try:
+                stat = os.stat(config_file)
+            except OSError:
+                return file_state, (None, None)
+            return (stat.st_mtime_ns, stat.st_size, None), (None, None)
+        if not modified and new_state[2] == file_state[2]:
+            return new_state, None
+        return new_state, ('json', data) if mapped is not None else self._parse_file_(config_file, content, new_state)
+
+    def _apply_reload_(self, config_type: str, data: object) -> None:
+        """Helper function to update the tree & search index to the reloaded data.
+
+        Nodes of unchanged data are kept as they are, along with their expanded state & the cursor.
+        """
+        if self.fold_task is not None:
+            self._end_fold_()
+        # error of an earlier invalid reload, if any
+        self.progress_bar.display = False
+        # changes in memory are discarded, so are their highlights
+        for node in self.highlighted:
+            node.data.style = self.default_highlight
+        self.highlighted.clear()
+
+        tree = self.json_tree
+        with self.profiler.phase('patch'):
+            if config_type != self.config_type:
+                tree.clear()
+                self.search_index = SearchIndex(data)
+                self.update_tree(config_type.upper(), tree.root, data, self.default_highlight)
+            else:
+                self._patch_node_(tree.root, self.json_data, data)
+        self.config_type, self.json_data, self.modified = config_type, data, False
+        # paths of the recorded changes may not exist anymore
+        self.journal.clear()
+        # labels are rendered from node data, repaint all lines at once
+        tree._invalidate()
+        self.cur_node = tree.cursor_node or tree.root
+
+    def _replace_node_(self, node: TreeNode, data: object, highlighter) -> None:
+        """Helper function to replace the data of a node & its children, keeping the node in its place."""
+        node.remove_children()
+        node.allow_expand = isinstance(data, (dict, list, JsonSpan))
+        self.update_tree(node.data.key, node, data, highlighter, populate=node.is_expanded)
+
+    def _rebind_(self, node: TreeNode, data: object) -> None:
+        """Helper function to bind a node & the nodes under it to the same data in another document."""
+        stack = [(node, data)]
+        while stack:
+            cur, data = stack.pop()
+            if cur.data.kind is NodeType.VALUE:
+                continue
+            cur.data.data = data
+            if cur.data.pending is None:
+                stack.extend((child, data[key]) for child, key in self._elements_(cur) if child.allow_expand)
+
+    def _elements_(self, node: TreeNode):
+        """Generator of the added nodes of the elements of a nested node, with their keys, through its range groups.
+        Range groups are bound to the dict/list of the node on the way.
+        """
+        is_list = node.data.kind is NodeType.LIST
+        stack = [(node, 0)]
+        while stack:
+            cur, offset = stack.pop()
+            for child in cur._children:
+                bounds = child.data.bounds
+                if bounds is not None:
+                    child.data.data = node.data.data
+                    stack.append((child, offset + bounds[0]))
+                else:
+                    yield child, child.data.key + offset if is_list else child.data.key
+
+    def _patch_node_(self, node: TreeNode, old: object, new: object) -> int:
+        """Helper function to update the nodes under a node from old to new data, touching only the changed ones.
+
+        Returns:
+            number of nodes patched
+        """
+        def _kind_(val) -> str:
+            return 'dict' if isinstance(val, dict) else 'list' if isinstance(val, list) else None
+
+        index, patched = self.search_index, 0
+        stack = [(node, tuple(self._get_abs_key_(node)), old, new)]
+        while stack:
+            cur, path, old, new = stack.pop()
+            if isinstance(new, JsonSpan) and cur.allow_expand and cur.data.pending is None:
+                # children of the node are shown, decode the data to keep them
+                new = new.decode()
+                cur.parent.data.data[path[-1]] = new
+            if type(old) is type(new) and old == new:
+                self._rebind_(cur, new)
+                continue
+            patched += 1
+            kind = _kind_(old)
+            if kind is None or kind != _kind_(new) or cur.data.pending is not None:
+                # values & nodes which are not populated yet are replaced
+                index.remove(path, old)
+                index.add(path, new)
+                self._replace_node_(cur, new, self.default_highlight)
+                continue
+
+            cur.data.data = new
+            children = cur._children
+            if children and children[0].data.bounds is not None or len(new) > self.chunk_size:
+                # range groups are based on positions, elements are patched in place only if the keys are unchanged
+                if len(old) != len(new) or kind == 'dict' and list(old) != list(new):
+                    index.remove(path, old)
+                    index.add(path, new)
+                    self._replace_node_(cur, new, self.default_highlight)
+                else:
+                    stack.extend((child, path + (key,), old[key], new[key]) for child, key in self._elements_(cur))
+                continue
+            if kind == 'list':
+                # skip the unchanged elements at both ends, so that an insert or delete only shifts the elements after it
+                size = min(len(old), len(new))
+                head = 0
+                while head < size and type(old[head]) is type(new[head]) and old[head] == new[head]:
+                    head += 1
+                tail = 0
+                while tail < size - head and type(old[-1 - tail]) is type(new[-1 - tail]) and old[-1 - tail] == new[-1 - tail]:
+                    tail += 1
+                old_end, new_end = len(old) - tail, len(new) - tail
+                shared = min(old_end, new_end)          # elements changed in place
+                for idx in range(old_end - 1, shared - 1, -1):
+                    index.remove(path + (idx,), old[idx])
+                    children[idx].remove()
+                tail_nodes = children[shared:]
+                shift = new_end - old_end
+                # renumber the shifted elements. move them in the index starting from the free end, to not overwrite others
+                if shift:
+                    order = reversed(range(tail)) if shift > 0 else range(tail)
+                    index.shift(path, ((old_end + pos, new[new_end + pos]) for pos in order), shift)
+                    for pos, sibling in enumerate(tail_nodes):
+                        sibling.data.key = new_end + pos
+                added = []
+                for idx in range(shared, new_end):
+                    index.add(path + (idx,), new[idx])
+                    added.append(cur.add(""))
+                    self.update_tree(idx, added[-1], new[idx], self.default_highlight, populate=False)
+                children[shared:] = added + tail_nodes
+                # unchanged elements at both ends keep their nodes, bound to the new data
+                for idx in chain(range(head), range(new_end, len(new))):
+                    self._rebind_(children[idx], new[idx])
+                stack.extend((children[idx], path + (idx,), old[idx], new[idx]) for idx in range(head, shared))
+            else:
+                nodes = {child.data.key: child for child in children}
+                for key in old:
+                    if key not in new:
+                        index.remove(path + (key,), old[key])
+                        nodes.pop(key).remove()
+                order = []
+                for key, value in new.items():
+                    child = nodes.get(key)
+                    if child is None:
+                        index.add(path + (key,), value)
+                        child = cur.add("")
+                        self.update_tree(key, child, value, self.default_highlight, populate=False)
+                    else:
+                        stack.append((child, path + (key,), old[key], value))
+                    order.append(child)
+                # new keys are added at the end, move them to their position in the file
+                children[:] = order
+        return patched
+
+    @profiled('edit')
+    def edit_value(self) -> bool:
+        """Update the value in a node.
+
+        Returns:
+            boolean status whether update is successful
+        """
+
+        node_data = self.cur_node.data
+        old_value = node_data.value
+        new_value = self.edit_box.value
+
+        try:
+            # type of keys of nested data is kept in strict mode, like the type of values
+            new_value = cast_value(new_value, old_value, self.infer_types)
+        except Exception as e:
+            self._invalid_input_handler_(f'INVALID VALUE. Error: {e}')
+            return False    # do not make any changes if conversion failed
+        if isinstance(new_value, (dict, list)):
+            status = self.add_new_node()             # call add node function if new data type is nested
+            return status
+
+        # skip if there is no change
+        if old_value == new_value:
+            return True
+
+        # renaming to an existing key would overwrite its data
+        if node_data.kind is NodeType.DICT and new_value in self.cur_node.parent.data.data:
+            self._invalid_input_handler_(f"INVALID KEY. Key '{new_value}' already exists")
+            return False
+
+        # highligh parent node if edited value is in a list
+        if node_data.kind is NodeType.VALUE and self.cur_node.parent.data.kind is NodeType.LIST:
+            self._highlight_node_(self.cur_node.parent, self.edit_highlight)
+
+        # update in-memory yaml object
+        status = self._update_yaml_(new_value, action='edit')
+        # updates key for expandable/nested data
+        node_data.value = new_value
+        self._highlight_node_(self.cur_node, self.edit_highlight)
+
+        return status
+
+    @profiled('insert')
+    def add_new_node(self) -> bool:
+        """Add a new node to the tree.
+
+        Returns:
+            boolean status whether insertion is successful
+        """
+        data = self.edit_box.value
+        # data inserted in a range group is added to its dict/list
+        node = self.cur_node
+        while node.data.bounds is not None:
+            node = node.parent
+        try:
+            data = eval(data, {})
+            if node.data.kind is NodeType.DICT and not isinstance(data, dict):
+                raise Exception('Value must be a dictionary for a node of dict type')
+        except Exception as e:
+            self._invalid_input_handler_(f'INVALID FORMAT. Error: {e}')
+            return False
+
+        # materialize existing children first, so that new ones are added after them
+        if not self._load_children_(node):
+            return False
+        if node.data.kind is NodeType.VALUE:
+            status = self._update_yaml_(data, action='insert', node=node)
+            # convert leaf node to expandable
+            node.allow_expand = True
+            self.update_tree(node.data.key, node, data, self.insert_highlight)
+        else:
+            container = node.data.data
+            # new elements are added at the end, find the node or range group holding it before the data is changed
+            parent, position = self._locate_(node, len(container))
+            existing = [key for key in data if key in container] if node.data.kind is NodeType.DICT else []
+            status = self._update_yaml_(data, action='insert', node=node)
+            if node.data.kind is NodeType.LIST:
+                self._add_child_(parent, position, data, position, self.insert_highlight)
+            else:
+                # existing keys are updated in their place, only new keys are added
+                for key in existing:
+                    self._replace_node_(self._child_node_(node, key), data[key], self.insert_highlight)
+                for key, value in data.items():
+                    if key not in existing:
+                        self._add_child_(parent, key, value, position, self.insert_highlight)
+                        position += 1
+            self._highlight_node_(node, self.insert_highlight)
+        if status: self.edit_box.value = ''        # reset edit field value
+
+        return status
+
+    def action_toggle_dark(self) -> None:
+        """An action to toggle dark mode."""
+        self.dark = not self.dark
+
+    def action_toggle(self) -> None:
+        """An action to show/hide entire configuration."""
+        if self.json_tree.root.is_expanded:
+            self._start_fold_(0, 'Collapsing')
+        else:
+            # number of nodes is known only when all levels are expanded
+            total = len(self.search_index.locations) if self.expand_level is None else None
+            self._start_fold_(self.expand_level, 'Expanding', total, self.expand_limit)
+
+    def action_expand_level(self, level: int) -> None:
+        """An action to show the configuration upto a depth."""
+        self._start_fold_(level, f'Expanding to level {level}', limit=self.expand_limit)
+
+    def _fold_nodes_(self, node: TreeNode, level: int):
+        """Generator to expand the nodes upto a depth & collapse the deeper ones. Yields number of nodes done after each batch.
+
+        Nodes are marked as expanded directly, as `expand_all` posts a message for each node & refreshes the tree at once.
+        """
+        done, next_batch = 0, self.fold_batch
+        stack = [(node, 0)]
+        while stack:
+            cur, depth = stack.pop()
+            if level is None or depth < level:
+                if not self._load_children_(cur):
+                    continue        # invalid data is left collapsed
+                cur._expanded = True
+                # range groups are at the depth of their dict/list
+                stack.extend((child, depth + (child.data.bounds is None)) for child in reversed(cur.children) if child.allow_expand)
+                done += len(cur.children)
+            elif cur._expanded:
+                cur._expanded = False
+                stack.extend((child, depth + (child.data.bounds is None)) for child in cur.children if child._expanded)
+                done += 1
+            if done >= next_batch:
+                yield done
+                next_batch = done + self.fold_batch
+        yield done
+
+    def _start_fold_(self, level: int, title: str, total: int = None, limit: int = 0) -> None:
+        """Helper function to expand/collapse the tree in batches, without blocking the UI."""
+        self.fold_task = self._fold_nodes_(self.json_tree.root, level)
+        self.fold_start = time.perf_counter()
+        self._show_progress_(title, total)
+        self.run_worker(self._fold_(self.fold_task, limit), group='fold', exclusive=True)
+
+    async def _fold_(self, task, limit: int = 0) -> None:
+        """Worker to run the expand/collapse in batches, on the event loop of the UI. Asks to go on after `limit` nodes."""
+        while task is self.fold_task:
+            done = next(task, None)
+            if done is None:
+                self._end_fold_()
+                break
+            self.progress_bar.progress = done
+            if limit and done >= limit:
+                limit = 0
+                if not await self._confirm_fold_(done):
+                    if task is self.fold_task:
+                        self._end_fold_()
+                    break
+            # let the UI handle the pending events & repaint before the next batch
+            await asyncio.sleep(0)
+
+    async def _confirm_fold_(self, done: int) -> bool:
+        """Helper function to show the nodes expanded so far & ask whether to expand the rest."""
+        self.json_tree._invalidate()
+        confirmed = asyncio.get_running_loop().create_future()
+
+        def get_return_status(status: bool) -> None:
+            """Called when AlertScreen is dismissed."""
+            if not confirmed.done():
+                confirmed.set_result(status)
+
+        self.push_screen(AlertScreen(message=f'Expanded {done:,} nodes. Expand the rest too? It may take a while'), get_return_status)
+        return await confirmed
+
+    def _end_fold_(self) -> None:
+        """Helper function to show the expanded/collapsed nodes, after the expand/collapse is done or cancelled."""
+        self.profiler.record('expand', self.fold_start, time.perf_counter(), nodes=self.progress_bar.progress)
+        self.fold_task = None
+        self.progress_bar.display = False
+        self.json_tree._invalidate()
+
+    def action_cancel(self) -> None:
+        """An action to cancel a running expand/collapse, else to close the search."""
+        if self.fold_task is not None:
+            self._end_fold_()
+        else:
+            self.action_close_search()
+
+    @profiled('reload')
+    def action_reload(self) -> None:
+        """Reload the configuration file. Only the nodes of data changed on disk or in memory are updated."""
+        try:
+            if not self.modified and self._file_stat_() == self.file_state[:2]:
+                return      # nothing to reload
+        except OSError:
+            pass        # file is removed, which is reported as an invalid file
+        self.file_state, loaded = self._read_changes_(self.config_file, self.modified, self.file_state)
+        if loaded is None:
+            return
+        if loaded[0] is None:
+            self._invalid_file_(self.session)
+            return
+        self._apply_reload_(*loaded)
+
+    def _check_file_(self) -> None:
+        """Reload the files changed by another process, after a confirmation if there are unsaved changes."""
+        for session in self.sessions:
+            if isinstance(self.screen, ModalScreen):
+                return
+            with self._use_session_(session):
+                self._check_session_()
+
+    def _check_session_(self) -> None:
+        """Helper function to reload the file of the active session, if it is changed by another process."""
+        if self.loading or self.reloading:
+            return
+        try:
+            stat = self._file_stat_()
+        except OSError:
+            return      # file is being replaced
+        if stat in (self.file_state[:2], self.ignored_stat):
+            return
+        session = self.session
+        if not self.modified:
+            session.reloading = True
+            self.run_worker(partial(self._reload_worker_, session), group='reload')
+            return
+
+        def get_return_status(status: bool) -> None:
+            """Called when AlertScreen is dismissed."""
+            if status:
+                session.reloading = True
+                self.run_worker(partial(self._reload_worker_, session), group='reload')
+            else:
+                session.ignored_stat = stat
+
+        self.push_screen(AlertScreen(message=f'\\[{self.config_file}] is changed on disk. Reload & discard your changes?'), get_return_status)
+
+    def _reload_worker_(self, session: EditSession) -> None:
+        """Worker to re-read & parse a changed file in a thread. The tree is patched on the UI thread."""
+        edits = session.modified, session.journal.changes
+        file_state, loaded = self._read_changes_(session.config_file, session.modified, session.file_state)
+
+        def reload(status: bool = True) -> None:
+            if status:
+                with self._use_session_(session):
+                    self._apply_reload_(*loaded)
+
+        def apply() -> None:
+            session.file_state = file_state
+            session.reloading = False
+            # skip invalid files, as they may be written partially
+            if loaded is None or loaded[0] is None:
+                return
+            if (session.modified, session.journal.changes) == edits:
+                reload()
+                return
+            # file was edited while it was parsed
+            self.push_screen(AlertScreen(message=f'\\[{session.config_file}] is changed on disk. Reload & discard your changes?'), reload)
+
+        self.call_from_thread(apply)
+
+    def action_edit(self) -> None:
+        if self.cur_node.is_root or not self._editable_(self.cur_node.data):
+            return      # do not allow edits if it is root or node is not editable
+
+        if self.cur_node.parent.data.kind is NodeType.LIST and self.cur_node.data.kind is NodeType.DICT:
+            return      # do not allow key edits if node is a dictionary in a list
+
+        # set edit field properties for updates
+        self.edit_box.placeholder = self.edit_node_help
+        self.edit_box.tooltip = None
+        if self._editable_(self.cur_node.data):
+            self.edit_box.value = str(self.cur_node.data.value)
+            self.edit_box.disabled = False
+        else:
+            self.edit_box.value = ''
+            self.edit_box.disabled = True
+
+        # change focus to input box for editing
+        self.edit_box.focus()
+
+    @on(Tree.NodeExpanded)
+    def load_lazy_node(self, event: Tree.NodeExpanded) -> None:
+        event.stop()
+        # add children of the node on first expand
+        if not self._load_children_(event.node):
+            event.node.collapse()
+
+    @on(Tree.NodeHighlighted)
+    def toggle_edit_field(self, event: Tree.NodeHighlighted) -> None:
+        event.stop()
+        if event.node.tree is not self.json_tree:
+            return      # cursor of a file which is not shown
+        # track the current node in the tree
+        self.cur_node = event.node
+        # reset edit field before any changes
+        self.edit_box.border_subtitle = ''
+        self.edit_box.placeholder = self.edit_node_help
+        self.edit_box.tooltip = self.edit_node_help
+        self.edit_box.disabled = True
+        # preview value in the edit box, root has no data till the file is loaded
+        if self.cur_node.data is not None and self._editable_(self.cur_node.data):
+            self.edit_box.value = str(self.cur_node.data.value)
+        else:
+            self.edit_box.value = ''
+
+    @on(Input.Submitted, '#edit-node')
+    def edit_field_handler(self, event: Input.Submitted) -> None:
+        event.stop()
+        # check for input type: edit or add
+        if self.edit_box.placeholder == self.edit_node_help:
+            status = self.edit_value()
+        elif self.edit_box.placeholder == self.add_node_help:
+            status = self.add_new_node()
+
+        if status:
+            # reset edit field
+            self.edit_box.border_subtitle = ''
+            self.edit_box.disabled = True
+            # once input submitted change focus to tree for viewing
+            self.json_tree.focus()
+
+    @on(TabbedContent.TabActivated, '#files')
+    def switch_file_handler(self, event: TabbedContent.TabActivated) -> None:
+        event.stop()
+        self._switch_session_(self.sessions[int(event.tab.id.split('-')[1])])
+
+    def action_next_file(self, step: int = 1) -> None:
+        """Show the next (or previous) file, when many files are opened."""
+        if len(self.sessions) == 1 or isinstance(self.screen, ModalScreen):
+            return
+        index = (self.sessions.index(self.session) + step) % len(self.sessions)
+        self.query_one(TabbedContent).active = f'file-{index}'
+        self._switch_session_(self.sessions[index])
+
+    def _switch_session_(self, session: EditSession) -> None:
+        """Helper function to make a file the active one. Its tree, data & undo history are kept as they were."""
+        if session is self.session:
+            return
+        # expand/collapse & search are of the tree being hidden
+        if self.fold_task is not None:
+            self._end_fold_()
+        self.action_close_search()
+        self.session = session
+        self.json_tree.focus()
+        self.toggle_edit_field(self.json_tree.NodeHighlighted(self.cur_node))
+
+    def action_search(self) -> None:
+        """Show the search field."""
+        self.search_box.display = True
+        self.search_results.display = True
+        self.search_box.focus()
+
+    def action_close_search(self) -> None:
+        """Hide the search field & results."""
+        self.search_box.display = False
+        self.search_results.display = False
+        self.json_tree.focus()
+
+    @on(Input.Changed, '#search')
+    def search_handler(self, event: Input.Changed) -> None:
+        event.stop()
+        start = time.perf_counter()
+        self.search_hits = self.search_index.search(event.value, self.search_limit)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.search_results.clear_options()
+        options = []
+        for path in self.search_hits:
+            label = ' > '.join(str(k) for k in path)
+            value = self._traverse_yaml_data_(path)
+            if not isinstance(value, (dict, list)):
+                label = highlight_label('', label, value, self.delimiter)
+            options.append(label)
+        self.search_results.add_options(options)
+        more = '+' if len(self.search_hits) >= self.search_limit else ''
+        self.search_box.border_subtitle = f'{len(self.search_hits)}{more} matches in {elapsed:.1f} ms' if event.value else ''
+
+    @on(Input.Submitted, '#search')
+    def search_submit_handler(self, event: Input.Submitted) -> None:
+        event.stop()
+        # move to results list for choosing a match
+        if self.search_results.option_count:
+            self.search_results.highlighted = 0
+            self.search_results.focus()
+
+    @on(OptionList.OptionSelected, '#search-results')
+    def search_result_handler(self, event: OptionList.OptionSelected) -> None:
+        event.stop()
+        node = self._expand_to_path_(self.search_hits[event.option_index])
+        if node is not None:
+            self.json_tree.focus()
+
+    def _locate_(self, node: TreeNode, position: int, expand: bool = False) -> tuple:
+        """Helper function to find the node or range group holding a position of the dict/list of a node, adding the
+        deferred children on the way. A position after the last element is held by the last group.
+
+        Args:
+            expand (bool): Expand the range groups on the way.
+
+        Returns:
+            node or range group, & the position relative to it
+        """
+        self._load_children_(node)
+        while node._children and node._children[0].data.bounds is not None:
+            groups = node._children
+            node = next((group for group in groups if position < group.data.bounds[1]), groups[-1])
+            position -= node.data.bounds[0]
+            self._load_children_(node)
+            if expand:
+                node.expand()
+        return node, position
+
+    def _child_node_(self, node: TreeNode, key, expand: bool = False) -> TreeNode:
+        """Helper function to get the child of a node by its key, or None if it does not exist.
+        Range groups on the way are added, & expanded too if `expand`.
+        """
+        if not self._load_children_(node):
+            return None
+        container = node.data.data
+        if node.data.kind is NodeType.LIST:
+            if not 0 <= key < len(container):
+                return None
+            group, position = self._locate_(node, key, expand)
+            return group.children[position]
+        if key not in container:
+            return None
+        if node._children and node._children[0].data.bounds is not None:
+            node, _ = self._locate_(node, list(container).index(key), expand)
+        return next((child for child in node.children if child.data.key == key), None)
+
+    def _find_node_(self, path: tuple) -> TreeNode:
+        """Helper function to get the node of a path, adding the deferred children of its ancestors."""
+        node = self.json_tree.root
+        for key in path:
+            node = self._child_node_(node, key)
+            if node is None:
+                return None
+        return node
+
+    def _expand_to_path_(self, path: tuple) -> TreeNode:
+        """Helper function to expand the ancestors of a path & move the cursor to its node."""
+        node = self.json_tree.root
+        for key in path:
+            node.expand()
+            node = self._child_node_(node, key, expand=True)
+            if node is None:
+                return None
+
+        # build the lines of the tree, so that the node can be selected
+        self.json_tree.get_node_at_line(0)
+        self.json_tree.select_node(node)
+        self.json_tree.scroll_to_node(node)
+        return node
+
+    def action_insert_node(self) -> None:
+        """Add new nodes under the selected node"""
+        # set edit field properties for insertion
+        self.edit_box.placeholder = self.add_node_help
+        self.edit_box.tooltip = self.add_node_help
+        self.edit_box.value = ''
+        self.edit_box.disabled = False
+        # change focus to input box for editing
+        self.edit_box.focus()
+
+    def action_delete_node(self) -> None:
+        """Remove the selected node."""
+        # do not delete root node, or range groups of many elements at once
+        if self.cur_node.is_root or self.cur_node.data.bounds is not None:
+            return
+        # cursor may move before the dialog is dismissed
+        node = self.cur_node
+
+        def get_return_status(status: bool) -> None:
+            """Called when AlertScreen is dismissed."""
+            if status:
+                # delete the node on confirmation
+                with self.profiler.phase('delete'):
+                    parent = self._delete_node_(node)
+
+                # reset cursor to parent & generate a node event for updates
+                self.json_tree.select_node(parent)
+                self.toggle_edit_field(self.json_tree.NodeHighlighted(parent))
+
+        confirm_screen = AlertScreen(message=f"Delete node \[{' > '.join(str(k) for k in self._get_abs_key_(node))}] ?")
+        self.push_screen(confirm_screen, get_return_status)
+
+    def _delete_node_(self, node: TreeNode, record: bool = True) -> TreeNode:
+        """Helper function to remove a node & its data.
+
+        Returns:
+            parent of the removed node
+        """
+        parent = node.parent
+        # position of the node is needed to renumber the elements after it in a list
+        index = parent.children.index(node)
+        self._update_yaml_(None, action='delete', node=node, record=record)
+        node.remove()
+
+        # shift indices of the elements after the deleted one, instead of repainting the entire list
+        if parent.data.kind is NodeType.LIST:
+            for sibling in parent.children[index:]:
+                sibling.data.key -= 1
+                self._highlight_node_(sibling)
+        parent = self._resize_(parent, -1)
+
+        # highlight parent node to indicate change
+        self._highlight_node_(parent, self.delete_highlight)
+        return parent
+
+    def _add_node_(self, parent: TreeNode, key, value: object, position: int = None, comment=None) -> TreeNode:
+        """Helper function to add data & its node at a position under a nested node. Added at the end if position is None.
+
+        Returns:
+            added node
+        """
+        self._load_children_(parent)
+        container = parent.data.data
+        path = tuple(self._get_abs_key_(parent))
+        index = self.search_index
+        if isinstance(container, list):
+            position = key
+        elif position is None:
+            position = len(container)
+        # find the node or range group holding the position, before the data is changed
+        group, offset = self._locate_(parent, position)
+        if isinstance(container, list):
+            # elements after the position are shifted by one. move them in the index starting from the end
+            index.shift(path, ((idx, container[idx]) for idx in range(len(container) - 1, position - 1, -1)), 1)
+            container.insert(position, value)
+            if comment is not None:
+                container.ca.items[position] = comment
+        else:
+            self._insert_key_(container, key, value, position)
+        index.add(path + (key,), value)
+        return self._add_child_(group, offset if isinstance(container, list) else key, value, offset, self.insert_highlight)
+
+    def _add_child_(self, parent: TreeNode, key, value: object, position: int, highlighter) -> TreeNode:
+        """Helper function to add the node of an element, at a position under a node or range group.
+
+        Returns:
+            added node
+        """
+        node = parent.add("")
+        self.update_tree(key, node, value, highlighter, populate=False)
+        # nodes are added at the end, move it to its position
+        children = parent._children
+        children.insert(position, children.pop())
+        if parent.data.kind is NodeType.LIST:
+            for sibling in children[position + 1:]:
+                sibling.data.key += 1
+                self._highlight_node_(sibling)
+        self._resize_(parent, 1)
+        return node
+
+    def _resize_(self, node: TreeNode, change: int) -> TreeNode:
+        """Helper function to update the range groups holding a node, after elements are added to or removed from it.
+        Groups after them are shifted without changing their elements, & empty groups are removed.
+
+        Returns:
+            the node, or its nearest ancestor which is not removed
+        """
+        remaining = node
+        while node.data.bounds is not None:
+            parent = node.parent
+            siblings = parent._children
+            start, stop = node.data.bounds
+            node.data.bounds = (start, stop + change)
+            for sibling in siblings[siblings.index(node) + 1:]:
+                start, stop = sibling.data.bounds
+                sibling.data.bounds = (start + change, stop + change)
+                self._highlight_node_(sibling)
+            if node.data.bounds[0] == node.data.bounds[1]:
+                node.remove()
+                if remaining is node:
+                    remaining = parent
+            else:
+                self._highlight_node_(node)
+            node = parent
+        return remaining
+
+    def _apply_delta_(self, delta: Delta) -> TreeNode:
+        """Helper function to apply a delta of the journal to the data & to the affected nodes only.
+
+        Returns:
+            changed node, or the parent of a removed node
+        """
+        if delta.op == 'rename':
+            node = self._find_node_(delta.path)
+            self._update_yaml_(delta.new, action='edit', node=node, record=False)
+            node.data.key = delta.new
+        elif delta.old is ABSENT:
+            node = self._add_node_(self._find_node_(delta.path[:-1]), delta.path[-1], delta.new, delta.position, delta.comment)
+        elif delta.new is ABSENT:
+            return self._delete_node_(self._find_node_(delta.path), record=False)
+        else:
+            node = self._find_node_(delta.path)
+            container, key = node.parent.data.data, delta.path[-1]
+            self.search_index.remove(delta.path, container[key])
+            container[key] = delta.new
+            self.search_index.add(delta.path, delta.new)
+            self._replace_node_(node, delta.new, self.edit_highlight)
+        self._highlight_node_(node, self.insert_highlight if delta.old is ABSENT else self.edit_highlight)
+        return node
+
+    def _replay_(self, deltas: list, name: str) -> None:
+        """Helper function to apply the deltas of an undo/redo & move the cursor to the changed node."""
+        if not deltas:
+            return
+        if self.fold_task is not None:
+            self._end_fold_()
+        with self.profiler.phase(name, changes=len(deltas)):
+            for delta in deltas:
+                node = self._apply_delta_(delta)
+        self.modified = True
+        self.json_tree._invalidate()
+        node = self._expand_to_path_(tuple(self._get_abs_key_(node)))
+        self.toggle_edit_field(self.json_tree.NodeHighlighted(node))
+
+    def action_undo(self) -> None:
+        """Revert the last change."""
+        self._replay_(self.journal.undo(), 'undo')
+
+    def action_redo(self) -> None:
+        """Apply the last reverted change again."""
+        self._replay_(self.journal.redo(), 'redo')
+
+    def action_export_patch(self) -> None:
+        """Export the changes, which are not undone, as a json patch (RFC 6902)."""
+        patch = self.journal.to_patch()
+        try:
+            atomic_write(self.patch_file, lambda out: json.dump(patch, out, indent=2, default=self._patch_value_))
+        except OSError as e:
+            self._invalid_input_handler_(f'Failed to export changes. Error: {e}')
+            return
+        message = f'Exported {len(patch)} changes to [{self.patch_file}]'
+        if self.journal.dropped:
+            message += f'. {self.journal.dropped} oldest changes are not included due to the undo limit'
+        self.edit_box.border_subtitle = Text(message)
+
+    def _patch_value_(self, value) -> object:
+        """Helper function to encode the values of a json patch, which are not supported by json."""
+        return value.decode() if isinstance(value, JsonSpan) else str(value)
+
+    def action_save(self) -> None:
+        """Save the configuration changes."""
+        # in-memory data is updated by all changes, for any type of configuration
+        session = self.session
+
+        def saved(result: tuple) -> None:
+            """Called when SaveScreen is dismissed after a save."""
+            out_file, message = result
+            if len(self.sessions) == 1:
+                self.exit(result=0, message=message)
+                return
+            # other files are still open, changes are saved unless the file is saved as another file
+            if os.path.realpath(out_file) == os.path.realpath(session.config_file):
+                session.modified = False
+                # saved file is not reloaded by the next check, its hash is unknown until it is changed again
+                try:
+                    stat = os.stat(session.config_file)
+                    session.file_state = (stat.st_mtime_ns, stat.st_size, None)
+                except OSError:
+                    pass
+            self.edit_box.border_subtitle = Text(message)
+
+        # send user to Save As popup
+        self.push_screen(SaveScreen(input_file=self.config_file, config_type=self.config_type, data=self.json_data, yml_obj=self.yaml if self.config_type == 'yaml' else None, backup=self.backup), saved)
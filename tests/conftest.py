@@ -0,0 +1,5 @@
+# Description: Modules of the app are imported from its folder, as the app is run as a script
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'config_tui'))
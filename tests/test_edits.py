@@ -0,0 +1,102 @@
+# Description: Undo history, path lookup & batch edits, which run without the UI
+import json
+
+import pytest
+
+from core import ABSENT, Delta, EditJournal, batch_edit, locate, split_path
+
+
+def test_journal_undo_redo():
+    journal = EditJournal()
+    journal.record([Delta('set', ('a',), 1, 2)])
+    journal.record([Delta('set', ('b',), ABSENT, {'c': 1}), Delta('set', ('d',), 3, ABSENT, 0)])
+    undo = journal.undo()
+    # deltas are reverted in reverse order
+    assert [(delta.path, delta.old, delta.new) for delta in undo] == [(('d',), ABSENT, 3), (('b',), {'c': 1}, ABSENT)]
+    assert journal.redo()[0].path == ('b',)
+    assert journal.redo() == []
+    assert journal.to_patch() == [
+        {'op': 'replace', 'path': '/a', 'value': 2},
+        {'op': 'add', 'path': '/b', 'value': {'c': 1}},
+        {'op': 'remove', 'path': '/d'},
+    ]
+    assert journal.changes == 4
+
+
+def test_journal_record_drops_redo():
+    journal = EditJournal()
+    journal.record([Delta('set', ('a',), 1, 2)])
+    journal.undo()
+    journal.record([Delta('set', ('a',), 1, 3)])
+    assert journal.redo() == []
+    assert journal.size == 2
+
+
+def test_journal_limit():
+    journal = EditJournal(limit=10)
+    for value in range(3):
+        # 1 + 4 nodes per change
+        journal.record([Delta('set', ('a',), value, [value] * 3)])
+    assert journal.dropped == 1
+    assert journal.size == 10
+    assert len(journal.undo()) == len(journal.undo()) == 1
+    assert journal.undo() == []
+
+
+def test_rename_delta():
+    delta = Delta('rename', ('a', 'old'), 'old', 'new')
+    assert delta.inverse().path == ('a', 'new')
+    assert delta.to_patch() == {'op': 'move', 'from': '/a/old', 'path': '/a/new'}
+    assert Delta('set', ('a/b', 'c~d'), 1, 2).to_patch()['path'] == '/a~1b/c~0d'
+
+
+def test_split_path():
+    assert split_path('a.b.0') == ['a', 'b', '0']
+    assert split_path('a\\.b.c') == ['a.b', 'c']
+
+
+def test_locate():
+    data = {'a': {'list': [10, {'x': 1}]}, 1: 'number key', 'b': None}
+    assert locate(data, ['a', 'list', '1', 'x']) == (data['a']['list'][1], 'x')
+    assert locate(data, ['1']) == (data, 1)
+    # last key of a dict may be added
+    assert locate(data, ['a', 'new']) == (data['a'], 'new')
+    for keys in (['a', 'list', '5'], ['a', 'list', 'x'], ['b', 'c'], ['missing', 'c']):
+        with pytest.raises(KeyError):
+            locate(data, keys)
+
+
+def test_batch_edit_json(tmp_path):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'app': {'port': 80, 'mode': 'dev', 'hosts': ['a', 'b']}}))
+    status, messages = batch_edit(str(config_file), [
+        ('get', 'app.port'), ('set', 'app.port=8080'), ('set', 'app.mode=json'), ('set', 'app.debug=True'),
+        ('delete', 'app.hosts.0'),
+    ])
+    assert status, messages
+    assert messages[0] == 'app.port = 80'
+    # names of modules are kept as text
+    assert json.loads(config_file.read_text()) == {'app': {'port': 8080, 'mode': 'json', 'hosts': ['b'], 'debug': True}}
+
+
+def test_batch_edit_failure_keeps_file(tmp_path):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text('{"port": 80}')
+    status, messages = batch_edit(str(config_file), [('set', 'port=81'), ('delete', 'missing')], infer=False)
+    assert not status
+    assert messages[-1] == 'missing not found'
+    assert config_file.read_text() == '{"port": 80}'
+    status, messages = batch_edit(str(config_file), [('set', 'port=eighty')], infer=False)
+    assert not status and messages[0].startswith('INVALID VALUE for port')
+
+
+def test_batch_edit_yaml_keeps_formatting(tmp_path):
+    pytest.importorskip('ruamel.yaml')
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text('mask: 0o17\nlimit: 1_000\nname: app\n')
+    status, messages = batch_edit(str(config_file), [('set', 'name=time')])
+    assert status, messages
+    assert config_file.read_text() == 'mask: 0o17\nlimit: 1_000\nname: time\n'
+    config_file.write_text('a: 1  # comment\nb: [1, 2]\n')
+    assert batch_edit(str(config_file), [('set', 'a=2')])[0]
+    assert config_file.read_text() == 'a: 2  # comment\nb: [1, 2]\n'
@@ -0,0 +1,113 @@
+# Description: Memory-mapped json must decode like json.loads, & data which is never decoded must be saved as it is
+import io
+import json
+
+import pytest
+
+import core
+from core import JsonSpan, MappedJson, dump_json
+
+DATA = {
+    'text': 'brackets } ] { [ & "escaped quotes" \\ in strings',
+    'servers': [{'host': f'host-{i}', 'ports': [80, 443], 'tags': {'name': f'"{i}"]'}} for i in range(20)],
+    'unicode': 'café \U0001f600',
+    'empty': [{}, []],
+}
+
+
+def mapped(tmp_path, text: str, min_size: int = 64) -> MappedJson:
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(text)
+    return MappedJson(str(config_file), min_size=min_size)
+
+
+def decode_all(data: object) -> object:
+    """Decode the spans of nested data."""
+    if isinstance(data, JsonSpan):
+        data = data.decode()
+    if isinstance(data, dict):
+        return {key: decode_all(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [decode_all(value) for value in data]
+    return data
+
+
+def dumped(data: object) -> bytes:
+    out = io.TextIOWrapper(io.BytesIO(), write_through=True)
+    dump_json(data, out)
+    return out.buffer.getvalue()
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Run a test with orjson (if installed) & with the json module."""
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(core, 'load_orjson', lambda: None)
+    return request.param
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_decode(tmp_path, indent):
+    source = mapped(tmp_path, json.dumps(DATA, indent=indent))
+    root = source.root()
+    assert any(isinstance(value, JsonSpan) for value in root.values())
+    assert decode_all(root) == DATA
+
+
+def test_small_file_has_no_spans(tmp_path):
+    source = mapped(tmp_path, json.dumps(DATA), min_size=1 << 20)
+    assert len(source.starts) == 0
+    assert source.root() == DATA
+
+
+@pytest.mark.parametrize('text, error', [
+    ('{"a": [1, 2}', 'Mismatched'),
+    ('{"a": 1}}', 'Extra data'),
+    ('{"a": 1} [2]', 'Extra data'),
+    ('{"a": [1, 2]', 'Incomplete'),
+    ('{"a": "]}"', 'Incomplete'),
+    ('{"a": "}', 'Incomplete'),
+    ('{"a": ["x\\"]}', 'Incomplete'),
+    ('"text"', 'Not a json'),
+    ('', 'empty'),
+])
+def test_invalid(tmp_path, text, error):
+    with pytest.raises(ValueError, match=error):
+        mapped(tmp_path, text)
+
+
+def test_invalid_span_is_found_on_decode(tmp_path):
+    # brackets match, but the content is not json
+    source = mapped(tmp_path, '{"good": ["%s"], "bad": [1,, %s 2]}' % ('x' * 80, '0, ' * 30))
+    root = source.root()
+    assert root['good'].decode() == ['x' * 80]
+    with pytest.raises(ValueError):
+        root['bad'].decode()
+
+
+def test_save_copies_spans(tmp_path, encoder):
+    text = json.dumps(DATA, indent=2)
+    root = mapped(tmp_path, text).root()
+    assert dumped(root) == text.encode()
+
+
+def test_save_edited_span(tmp_path, encoder):
+    data = json.loads(json.dumps(DATA))
+    root = mapped(tmp_path, json.dumps(data, indent=2)).root()
+    # edit a decoded container, whose large children are still spans
+    servers = root['servers'].decode()
+    assert any(isinstance(value, JsonSpan) for value in servers)
+    del servers[3]
+    root['servers'] = servers
+    root['added'] = 1
+    del data['servers'][3]
+    data['added'] = 1
+    assert dumped(root) == json.dumps(data, indent=2).encode()
+
+
+def test_save_same_bytes_as_json(encoder):
+    data = {'floats': [1e22, 1e16, 1e-05, 1e-7, 0.5, 1.5e300], 'nan': float('nan'), 'inf': [float('-inf')],
+            'text': DATA['unicode'], 'big': 2 ** 70}
+    assert dumped(data) == json.dumps(data, indent=2).encode()
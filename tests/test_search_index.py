@@ -0,0 +1,108 @@
+# Description: Updates of the search index must leave the same entries, in the same order, as indexing the data again
+import random
+
+import pytest
+
+from core import SearchIndex
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    """Blocks of a few entries, so that updates cross block boundaries."""
+    monkeypatch.setattr(SearchIndex, 'BLOCK_SIZE', 4)
+
+
+def entries(index: SearchIndex) -> list:
+    """Entries of the index in order, as (path, key line, path line), without the removed ones."""
+    found = []
+    for block_no, block in enumerate(index.blocks):
+        key_lines, path_lines = block.edit()
+        for idx, (path, key_line, path_line) in enumerate(zip(block.paths, key_lines, path_lines)):
+            if path is not None:
+                assert index.locations[path] == block_no * index.BLOCK_SIZE + idx
+                found.append((path, key_line, path_line))
+    assert len(found) == len(index.locations)
+    return found
+
+
+def delete(index: SearchIndex, data: dict, path: tuple) -> None:
+    """Delete an element of a list, updating the index like the editor does."""
+    container, key = data, path[-1]
+    for step in path[:-1]:
+        container = container[step]
+    index.remove(path, container.pop(key))
+    index.shift(path[:-1], ((idx + 1, container[idx]) for idx in range(key, len(container))), -1)
+
+
+def insert(index: SearchIndex, data: dict, path: tuple, value: object) -> None:
+    """Insert an element in a list, updating the index like the editor does."""
+    container, key = data, path[-1]
+    for step in path[:-1]:
+        container = container[step]
+    index.shift(path[:-1], ((idx, container[idx]) for idx in range(len(container) - 1, key - 1, -1)), 1)
+    container.insert(key, value)
+    index.add(path, value)
+
+
+def test_search():
+    index = SearchIndex({'server': {'host': 'Example.com', 'ports': [80, 443]}, 'debug': True})
+    assert index.search('example') == [('server', 'host')]
+    assert index.search('443') == [('server', 'ports', 1)]
+    assert index.search('server.ports') == [('server', 'ports'), ('server', 'ports', 0), ('server', 'ports', 1)]
+    assert index.search('ports', limit=1) == [('server', 'ports')]
+    assert index.search('') == []
+
+
+def test_add_replaces_in_place():
+    data = {'a': 1, 'b': {'c': 2}, 'd': 3}
+    index = SearchIndex(data)
+    data['b'] = {'c': 5, 'e': 6}
+    index.add(('b',), data['b'])
+    # replaced entries keep their position, new nested ones are appended
+    assert [path for path, _, _ in entries(index)] == [('a',), ('b',), ('b', 'c'), ('d',), ('b', 'e')]
+    assert index.search('5') == [('b', 'c')]
+
+
+def test_delete_renumbers_list():
+    data = {'items': [{'name': f'n{i}', 'tags': [i]} for i in range(6)], 'tail': 'end'}
+    index = SearchIndex(data)
+    delete(index, data, ('items', 1))
+    assert entries(index) == entries(SearchIndex(data))
+    assert index.search('items.1.name\x1fn2') == [('items', 1, 'name')]
+    assert index.removed == 4       # element, name, tags & its element
+
+
+def test_insert_renumbers_list():
+    data = {'items': [{'name': f'n{i}'} for i in range(5)]}
+    index = SearchIndex(data)
+    insert(index, data, ('items', 2), {'name': 'new', 'tags': [1, 2]})
+    # inserted entries are added at the end, the shifted ones are renumbered in place
+    assert sorted(entries(index)) == sorted(entries(SearchIndex(data)))
+    assert index.search('items.3.name') == [('items', 3, 'name')]
+    assert index.search('new') == [('items', 2, 'name')]
+
+
+def test_compact_keeps_order():
+    data = {'items': list(range(40)), 'last': 'x'}
+    index = SearchIndex(data)
+    for _ in range(30):
+        delete(index, data, ('items', 0))
+    # removed entries outnumbered the others & were dropped
+    assert index.removed < len(index.locations)
+    assert len(index.blocks) < 10
+    assert entries(index) == entries(SearchIndex(data))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_updates(seed):
+    rng = random.Random(seed)
+    data = {'list': [{'v': i, 'sub': [i, i + 1]} for i in range(20)], 'other': {'k': 'v'}}
+    index = SearchIndex(data)
+    for step in range(60):
+        items = data['list']
+        if items and rng.random() < 0.5:
+            delete(index, data, ('list', rng.randrange(len(items))))
+        else:
+            insert(index, data, ('list', rng.randint(0, len(items))), {'v': f's{step}', 'sub': [step]})
+        assert sorted(entries(index)) == sorted(entries(SearchIndex(data)))
+    assert sorted(index.search('list.', 10 ** 6)) == sorted(SearchIndex(data).search('list.', 10 ** 6))
@@ -0,0 +1,41 @@
+# Description: Options which run without the UI must not import the UI & yaml modules, as they are slow to import
+import json
+import os
+import subprocess
+import sys
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'config_tui', 'config-tui.py')
+HEAVY_MODULES = {'textual', 'rich', 'ruamel'}
+# max import time in seconds, generous for slow machines. benchmark.py --startup-budget checks a tighter one
+IMPORT_BUDGET = 0.25
+
+
+def imported_modules(*args) -> tuple:
+    """Top-level packages imported by a run of the app & their cumulative import time in seconds, from -X importtime."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', APP_FILE, *args], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    # lines as 'import time: <self us> | <cumulative us> | <module>', nested modules are indented
+    modules, import_us = set(), 0
+    for line in proc.stderr.splitlines():
+        fields = line.split('|')
+        if not line.startswith('import time:') or not fields[1].strip().isdigit():
+            continue
+        modules.add(fields[2].strip().split('.')[0])
+        if not fields[2][1:].startswith(' '):
+            import_us += int(fields[1])
+    return modules, import_us / 1e6
+
+
+def test_version():
+    modules, seconds = imported_modules('-v')
+    assert 'core' in modules
+    assert not modules & HEAVY_MODULES
+    assert seconds < IMPORT_BUDGET
+
+
+def test_batch_get_json(tmp_path):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'servers': [{'host': 'localhost'}]}))
+    modules, seconds = imported_modules('-i', str(config_file), '--get', 'servers.0.host')
+    assert not modules & HEAVY_MODULES
+    assert seconds < IMPORT_BUDGET